@@ -0,0 +1,150 @@
+"""Non-interactive batch mode for SmartOutfitRecommender.
+
+Reads prompts from a file or stdin (one per line, or JSONL records with a
+"prompt" field), runs them through a pool of worker processes and streams one
+JSON result per line to stdout, in input order. "line" is the input line
+number:
+
+    {"line": 1, "prompt": "...", "occasion": "...", "strategy": "...",
+     "outfits": [{"type": "...", "reason": "...", "items": [{"id": ..., "category": ...}, ...]}]}
+
+A line that holds no prompt (invalid JSON, a record without the field) gets
+an error record instead, as does a prompt the engine fails on, and the exit
+status is then 1:
+
+    {"line": 7, "error": "invalid JSON (Expecting value: line 1 column 2 (char 1))"}
+
+Nothing is rendered or opened unless asked for: --html-dir writes one page per
+prompt, --open additionally opens each page in the browser.
+
+Usage:
+    python batch_cli.py prompts.txt --workers 4 > results.jsonl
+    cat prompts.jsonl | python batch_cli.py - --html-dir out/
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from engine_loader import load_engine
+from replay_prompts import iter_prompts
+
+# Per-process state, set up once by _init_worker
+_recommender = None
+_html_dir = None
+
+
+def _init_worker(wardrobe_path: Optional[str], html_dir: Optional[str]) -> None:
+    global _recommender, _html_dir
+    engine = load_engine()
+    wardrobe = engine.wardrobe_db
+    if wardrobe_path:
+        from wardrobe_file import load_wardrobe
+        wardrobe = load_wardrobe(wardrobe_path)
+    _recommender = engine.SmartOutfitRecommender(wardrobe)
+    _html_dir = html_dir
+
+
+def result_record(line: int, prompt: str, result: Dict, strategy: Optional[str]) -> Dict:
+    """Compact, JSON-safe view of a recommend_outfits result"""
+    return {
+        "line": line,
+        "prompt": prompt,
+        "occasion": result["occasion"],
+        "strategy": strategy,
+        "context": result["context"],
+        "outfits": [
+            {
+                "type": outfit.get("type", ""),
+                "reason": outfit.get("reason", ""),
+                "items": [{"id": item["id"], "category": item["category"]} for item in outfit["items"]],
+            }
+            for outfit in result["outfits"]
+        ],
+    }
+
+
+def _run_one(job: Tuple[int, Optional[str], Optional[str]]) -> Dict:
+    line, prompt, error = job
+    if error is not None:
+        return {"line": line, "error": error}
+    try:
+        result = _recommender.recommend_outfits(prompt)
+    except Exception as e:
+        return {"line": line, "prompt": prompt, "error": f"{type(e).__name__}: {e}"}
+    record = result_record(line, prompt, result, _recommender.last_strategy)
+    if _html_dir is not None:
+        record["html"] = _recommender.generate_outfit_html(result["outfits"], directory=_html_dir)
+    return record
+
+
+def _run_chunk(jobs: List[Tuple[int, Optional[str], Optional[str]]]) -> List[Dict]:
+    return [_run_one(job) for job in jobs]
+
+
+def _chunks(jobs: Iterator, size: int) -> Iterator[List]:
+    chunk = []
+    for job in jobs:
+        chunk.append(job)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_batch(prompts: Iterator[Tuple[int, Optional[str], Optional[str]]], workers: int = 1,
+              wardrobe_path: Optional[str] = None, html_dir: Optional[str] = None,
+              chunksize: int = 16) -> Iterator[Dict]:
+    """Yield one record per iter_prompts entry, in input order, with at most 2 * workers chunks in flight"""
+    if workers <= 1:
+        _init_worker(wardrobe_path, html_dir)
+        yield from map(_run_one, prompts)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(wardrobe_path, html_dir)) as pool:
+        pending = deque()
+        for chunk in _chunks(prompts, chunksize):
+            pending.append(pool.submit(_run_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run prompts through the recommender and print JSONL results")
+    parser.add_argument("input", nargs="?", default="-", help="prompt file (text or JSONL), '-' for stdin")
+    parser.add_argument("--field", default="prompt", help="record field holding the prompt in JSONL input")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunksize", type=int, default=16)
+    parser.add_argument("--wardrobe", help="wardrobe file (.json/.jsonl) instead of the bundled wardrobe_db")
+    parser.add_argument("--html-dir", help="write an outfits page per prompt into this directory")
+    parser.add_argument("--open", action="store_true", help="open each written page in the browser")
+    args = parser.parse_args(argv)
+    if args.open and not args.html_dir:
+        parser.error("--open needs --html-dir")
+    if args.html_dir:
+        os.makedirs(args.html_dir, exist_ok=True)
+
+    stream = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    errors = 0
+    try:
+        for record in run_batch(iter_prompts(stream, args.field), args.workers, args.wardrobe,
+                                args.html_dir, args.chunksize):
+            errors += "error" in record
+            sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+            if args.open and "html" in record:
+                import webbrowser
+                webbrowser.open(f"file://{record['html']}")
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""Performance regression gate against a committed benchmark baseline.
+
+Runs bench_recommend with fixed seeds and compares each stage's latency with
+bench_baseline.json; a stage fails when it got slower than the allowed
+threshold (relative, with an absolute floor so microsecond stages do not
+flap). It also replays the prompt corpus through get_unique_outfits with a
+fixed context and per-prompt seeds and checks that the outfits are exactly
+the ones recorded in the baseline, so speedups cannot silently change
+recommendations.
+
+Usage:
+    python bench_compare.py                       # check, exit 1 on regression or changed outfits
+    python bench_compare.py --threshold 0.3 --stage-threshold strategy=0.5
+    python bench_compare.py --update-baseline     # record a new baseline
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from typing import Dict, List, Optional
+
+import bench_recommend
+from engine_loader import load_engine
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+DEFAULT_SIZES = [171, 2000]
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_MIN_DELTA_MS = 0.05
+DEFAULT_METRICS = ("p50_ms", "p95_ms")
+SEED = 7
+# get_context() depends on the clock; the differential check pins it
+FIXED_CONTEXTS = [
+    {"time": "evening", "weather": "pleasant", "season": "autumn", "needs_layer": False},
+    {"time": "morning", "weather": "cold", "season": "winter", "needs_layer": True},
+]
+
+
+def reference_outfits(sizes: List[int], seed: int = SEED, prompts: Optional[List[str]] = None) -> Dict:
+    """Outfits get_unique_outfits returns for every size x context x prompt, as id lists"""
+    engine = load_engine()
+    prompts = prompts or bench_recommend.PROMPT_CORPUS
+    reference = {}
+    for size in sizes:
+        recommender = engine.SmartOutfitRecommender(bench_recommend.scale_wardrobe(engine.wardrobe_db, size, seed))
+        per_size = {}
+        for ctx_no, context in enumerate(FIXED_CONTEXTS):
+            for i, prompt in enumerate(prompts):
+                random.seed(seed * 100003 + i)
+                occasions = recommender.analyze_occasion(prompt)
+                required, _, forbidden = recommender.extract_requirements(prompt)
+                outfits = recommender.get_unique_outfits(occasions, dict(context), required, forbidden)
+                per_size[f"{ctx_no}|{prompt}"] = [
+                    [outfit.get("type", "")] + [item["id"] for item in outfit["items"]] for outfit in outfits
+                ]
+        reference[str(size)] = per_size
+    return reference
+
+
+def compare_latency(baseline: Dict, current: Dict, threshold: float, stage_thresholds: Dict[str, float],
+                    min_delta_ms: float, metrics=DEFAULT_METRICS) -> List[str]:
+    """Return one message per stage/metric that regressed beyond its threshold"""
+    failures = []
+    base_by_size = {r["wardrobe_size"]: r for r in baseline["results"]}
+    for result in current["results"]:
+        base = base_by_size.get(result["wardrobe_size"])
+        if base is None:
+            continue
+        for stage, stats in result["stages"].items():
+            base_stats = base["stages"].get(stage)
+            if not base_stats:
+                continue
+            allowed = stage_thresholds.get(stage, threshold)
+            for metric in metrics:
+                old, new = base_stats[metric], stats[metric]
+                if new - old > min_delta_ms and new > old * (1 + allowed):
+                    failures.append(
+                        f"size {result['wardrobe_size']}: {stage} {metric} {old} -> {new} ms "
+                        f"(+{(new / old - 1) * 100 if old else float('inf'):.0f}%, allowed +{allowed * 100:.0f}%)"
+                    )
+    return failures
+
+
+def compare_outfits(baseline: Dict, current: Dict) -> List[str]:
+    """Return one message per prompt whose outfits differ from the baseline"""
+    failures = []
+    for size, expected in baseline.items():
+        got = current.get(size, {})
+        for key, outfits in expected.items():
+            if got.get(key) != outfits:
+                ctx_no, prompt = key.split("|", 1)
+                failures.append(f"size {size}, context {ctx_no}, {prompt!r}: {outfits} -> {got.get(key)}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the recommend benchmark against the stored baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--sizes", help="comma separated wardrobe sizes (default: those in the baseline)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed relative slowdown per stage, e.g. 0.25 for +25%%")
+    parser.add_argument("--stage-threshold", action="append", default=[], metavar="STAGE=FRACTION",
+                        help="override the threshold for one stage (repeatable)")
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS,
+                        help="ignore slowdowns smaller than this many milliseconds")
+    parser.add_argument("--skip-latency", action="store_true", help="only run the differential outfit check")
+    parser.add_argument("--update-baseline", action="store_true", help="write the current run as the new baseline")
+    args = parser.parse_args(argv)
+
+    stage_thresholds = {}
+    for spec in args.stage_threshold:
+        stage, _, value = spec.partition("=")
+        stage_thresholds[stage] = float(value)
+
+    baseline = None
+    if not args.update_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    if args.sizes:
+        sizes = [int(s) for s in args.sizes.split(",") if s]
+    elif baseline:
+        sizes = [r["wardrobe_size"] for r in baseline["latency"]["results"]]
+    else:
+        sizes = DEFAULT_SIZES
+
+    outfits = reference_outfits(sizes)
+    latency = None
+    if not args.skip_latency or args.update_baseline:
+        latency = bench_recommend.run(sizes, args.repeat, SEED, memory=False)
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"seed": SEED, "latency": latency, "outfits": outfits}, f, indent=1, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    failures = compare_outfits(baseline["outfits"], outfits)
+    for message in failures:
+        print(f"OUTFITS CHANGED  {message}")
+    if latency is not None:
+        regressions = compare_latency(baseline["latency"], latency, args.threshold, stage_thresholds,
+                                      args.min_delta_ms)
+        for message in regressions:
+            print(f"REGRESSION       {message}")
+        failures += regressions
+    if failures:
+        print(f"{len(failures)} check(s) failed")
+        return 1
+    print("No regressions; outfits identical to baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""Benchmark harness for SmartOutfitRecommender.recommend_outfits.
+
+Replays a fixed prompt corpus (every occasion strategy, every sporty
+activity, color and layer constrained prompts) against wardrobes of
+increasing size and reports per-stage p50/p95/p99 latency, throughput and
+peak traced memory as JSON. Stages are measured through the engine's own
+stage_hooks, so they match what stage_timing and the metrics exporter see.
+
+Larger wardrobes are the bundled items topped up with synthetic ones from
+synth_wardrobe.py (same seed, same wardrobe). A prompt corpus recorded or
+generated as JSONL can replace the built-in one with --prompts.
+
+Usage: python bench_recommend.py [--sizes 171,10000,100000] [--repeat 3] [--seed 7]
+                                 [--prompts prompts.jsonl] [--no-memory] [--out bench.json]
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+from engine_loader import load_engine
+from stage_timing import STAGES
+from synth_wardrobe import generate_items
+from wardrobe_file import iter_jsonl
+
+PROMPT_CORPUS = [
+    # occasion strategies
+    "office meeting",
+    "business meeting tomorrow",
+    "interview at a bank",
+    "funeral",
+    "party tonight",
+    "office party",
+    "beach party",
+    "wedding",
+    "date night",
+    "ritual at temple",
+    "festival celebration",
+    "office ritual ceremony",
+    "casual outing",
+    "picnic",
+    "shopping at the mall",
+    # sporty occasions
+    "swimming",
+    "gym workout",
+    "hiking trip",
+    "trekking in the mountains",
+    "yoga class",
+    "camping",
+    "running",
+    "cycling",
+    # color constrained
+    "party in red",
+    "wedding in green",
+    "funeral in navy",
+    "office in black",
+    "casual outing in blue",
+    "gym in white",
+    # layer constrained
+    "office with blazer",
+    "party with jacket",
+    "casual outing with sweater",
+    "wedding in pink with layer",
+]
+DEFAULT_SIZES = [171, 10_000, 100_000]
+
+
+def scale_wardrobe(base: List[Dict], size: int, seed: int = 7) -> List[Dict]:
+    """The base items followed by synthetic ones until the wardrobe has `size` items"""
+    items = [dict(item, tags=list(item["tags"])) for item in base[:size]]
+    items.extend(generate_items(size - len(items), seed))
+    return items
+
+
+def load_prompts(path: str, field: str = "prompt") -> List[str]:
+    """Read a prompt corpus from JSONL ({"prompt": ...} per line)"""
+    return [record[field] for record in iter_jsonl(path) if record.get(field)]
+
+
+class _SampleHooks:
+    """Stage hooks that keep every raw sample, so percentiles are exact"""
+
+    clock = staticmethod(time.perf_counter)
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.events: Dict[str, Counter] = defaultdict(Counter)
+
+    def start(self) -> float:
+        return self.clock()
+
+    def lap(self, stage: str, started: float) -> float:
+        now = self.clock()
+        self.samples[stage].append(now - started)
+        return now
+
+    def event(self, name: str, value) -> None:
+        self.events[name][value] += 1
+
+    def cache(self, name: str, hit: bool) -> None:
+        self.events["cache:" + name]["hit" if hit else "miss"] += 1
+
+
+class _PeakMemoryHooks:
+    """Stage hooks that record the tracemalloc peak reached inside each stage"""
+
+    def __init__(self):
+        self.peak_bytes: Dict[str, int] = defaultdict(int)
+
+    def start(self) -> float:
+        tracemalloc.reset_peak()
+        return 0.0
+
+    def lap(self, stage: str, started: float) -> float:
+        self.peak_bytes[stage] = max(self.peak_bytes[stage], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        return 0.0
+
+    def event(self, name: str, value) -> None:
+        pass
+
+    def cache(self, name: str, hit: bool) -> None:
+        pass
+
+
+def percentile(sorted_samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return 0.0
+    rank = max(0, min(len(sorted_samples) - 1, math.ceil(pct / 100 * len(sorted_samples)) - 1))
+    return sorted_samples[rank]
+
+
+def _latency_summary(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 3) if samples else 0.0,
+    }
+
+
+def bench_size(engine, size: int, prompts: List[str], repeat: int, seed: int, memory: bool = True) -> Dict:
+    """Time every stage over prompts x repeat, then do one traced pass for peak memory"""
+    build_start = time.perf_counter()
+    recommender = engine.SmartOutfitRecommender(scale_wardrobe(engine.wardrobe_db, size, seed))
+    build_s = time.perf_counter() - build_start
+
+    random.seed(seed)
+    hooks = _SampleHooks()
+    recommender.stage_hooks = hooks
+    request_samples = []
+    wall_start = time.perf_counter()
+    for _ in range(repeat):
+        for prompt in prompts:
+            start = time.perf_counter()
+            result = recommender.recommend_outfits(prompt)
+            recommender.render_outfit_html(result["outfits"])
+            request_samples.append(time.perf_counter() - start)
+    wall_s = time.perf_counter() - wall_start
+
+    # Peak memory is traced in a separate pass; tracemalloc distorts timings
+    peak_bytes: Dict[str, int] = {}
+    if memory:
+        random.seed(seed)
+        mem_hooks = _PeakMemoryHooks()
+        recommender.stage_hooks = mem_hooks
+        tracemalloc.start()
+        try:
+            for prompt in prompts:
+                result = recommender.recommend_outfits(prompt)
+                recommender.render_outfit_html(result["outfits"])
+        finally:
+            tracemalloc.stop()
+        peak_bytes = mem_hooks.peak_bytes
+    recommender.stage_hooks = None
+
+    return {
+        "wardrobe_size": size,
+        "build_s": round(build_s, 3),
+        "requests": len(request_samples),
+        "zero_outfit_requests": hooks.events["zero_outfits"][True],
+        "fallback_requests": hooks.events["fallback"][True],
+        "throughput_rps": round(len(request_samples) / wall_s, 2) if wall_s else None,
+        "request": _latency_summary(request_samples),
+        "strategies": dict(sorted(hooks.events["strategy"].items())),
+        "stages": {
+            stage: dict(_latency_summary(hooks.samples[stage]),
+                        peak_mem_kib=round(peak_bytes.get(stage, 0) / 1024, 1) if memory else None)
+            for stage in STAGES if hooks.samples[stage]
+        },
+    }
+
+
+def run(sizes: List[int], repeat: int = 3, seed: int = 7, prompts: Optional[List[str]] = None,
+        memory: bool = True, progress=None) -> Dict:
+    engine = load_engine()
+    prompts = prompts or PROMPT_CORPUS
+    results = []
+    for size in sizes:
+        if progress:
+            progress(f"benchmarking wardrobe of {size} items ...")
+        results.append(bench_size(engine, size, prompts, repeat, seed, memory))
+    return {
+        "python": sys.version.split()[0],
+        "seed": seed,
+        "repeat": repeat,
+        "prompts": len(prompts),
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark recommend_outfits over a prompt corpus")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma separated wardrobe sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the prompt corpus per size")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--prompts", help="JSONL prompt corpus to use instead of the built-in one")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="skip the tracemalloc pass (it is slow on large wardrobes)")
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    prompts = load_prompts(args.prompts) if args.prompts else None
+    report = run(sizes, args.repeat, args.seed, prompts, memory=not args.no_memory, progress=lambda msg: print(msg, file=sys.stderr))
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
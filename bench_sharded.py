@@ -0,0 +1,131 @@
+"""Benchmark sharded.ShardedRecommender against a single SmartOutfitRecommender.
+
+Both serve the same prompt corpus over the same scaled wardrobe (see
+bench_recommend) from the same random seed. Reported per side: startup
+(loading and indexing the wardrobe until the first request can be served),
+the first pass over the corpus (for the sharded side, the pass that fetches
+pool items from the shards) and the passes after it, with per-request
+latency percentiles. For the sharded side also the candidates the shards
+returned per request and the items fetched into the coordinator. "speedup"
+is single time / sharded time, so below 1 means sharding costs time. The
+outfits of both sides are compared; they must be identical.
+
+Shard processes only filter in parallel with as many CPUs as shards;
+cpu_count is in the report.
+
+Usage: python bench_sharded.py [--size 50000] [--shards 4] [--repeat 3] [--seed 7] [--out bench.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from bench_recommend import PROMPT_CORPUS, _latency_summary, scale_wardrobe
+from engine_loader import load_engine
+from sharded import ShardedRecommender
+
+
+def _passes(recommend: Callable[[str], Dict], prompts: List[str], repeat: int, seed: int,
+            after: Optional[Callable[[], None]] = None) -> Dict:
+    """Time the first pass over prompts and the repeat passes after it; also return every outfit's item ids.
+
+    after() runs after each request, outside the timing.
+    """
+    random.seed(seed)
+    samples: List[List[float]] = []
+    outfits = []
+    for _ in range(1 + repeat):
+        pass_samples = []
+        for prompt in prompts:
+            start = time.perf_counter()
+            result = recommend(prompt)
+            pass_samples.append(time.perf_counter() - start)
+            outfits.append([[item["id"] for item in outfit["items"]] for outfit in result["outfits"]])
+            if after is not None:
+                after()
+        samples.append(pass_samples)
+    warm = [s for pass_samples in samples[1:] for s in pass_samples]
+    return {
+        "first_pass_s": round(sum(samples[0]), 3),
+        "warm_pass_s": round(sum(warm) / repeat, 3) if repeat else None,
+        "first_pass": _latency_summary(samples[0]),
+        "warm": _latency_summary(warm) if warm else None,
+        "outfits": outfits,
+    }
+
+
+def _speedup(single, sharded):
+    return round(single / sharded, 2) if single and sharded else None
+
+
+def run(size: int, shards: int, repeat: int = 3, seed: int = 7, progress=None) -> Dict:
+    engine = load_engine()
+    items = scale_wardrobe(engine.wardrobe_db, size, seed)
+
+    if progress:
+        progress(f"single recommender over {size} items ...")
+    start = time.perf_counter()
+    single = engine.SmartOutfitRecommender(items).warm()
+    single_startup = time.perf_counter() - start
+    single_report = _passes(single.recommend_outfits, PROMPT_CORPUS, repeat, seed)
+
+    if progress:
+        progress(f"{shards} shard processes over {size} items ...")
+    start = time.perf_counter()
+    with ShardedRecommender(items, shards) as sharded:
+        sharded_startup = time.perf_counter() - start
+        candidates: List[int] = []
+        sharded_report = _passes(sharded.recommend_outfits, PROMPT_CORPUS, repeat, seed,
+                                 lambda: candidates.append(sharded.last_candidates))
+        fetched = sharded.fetched
+        shard_sizes = sharded.shard_sizes
+
+    identical = single_report.pop("outfits") == sharded_report.pop("outfits")
+    single_report["startup_s"] = round(single_startup, 3)
+    sharded_report["startup_s"] = round(sharded_startup, 3)
+    sharded_report["shard_sizes"] = shard_sizes
+    sharded_report["mean_candidates"] = round(sum(candidates) / len(candidates), 1)
+    sharded_report["items_fetched"] = fetched
+    return {
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "wardrobe_size": size,
+        "shards": shards,
+        "seed": seed,
+        "repeat": repeat,
+        "prompts": len(PROMPT_CORPUS),
+        "identical_outfits": identical,
+        "single": single_report,
+        "sharded": sharded_report,
+        "speedup": {
+            "startup": _speedup(single_startup, sharded_startup),
+            "first_pass": _speedup(single_report["first_pass_s"], sharded_report["first_pass_s"]),
+            "warm_pass": _speedup(single_report["warm_pass_s"], sharded_report["warm_pass_s"]),
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the sharded recommender against a single one")
+    parser.add_argument("--size", type=int, default=50_000, help="wardrobe size")
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the prompt corpus after the first")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+    report = run(args.size, args.shards, args.repeat, args.seed, progress=lambda msg: print(msg, file=sys.stderr))
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0 if report["identical_outfits"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
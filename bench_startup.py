@@ -0,0 +1,101 @@
+"""Startup benchmark: time-to-first-recommendation for the PRO.PY CLI.
+
+Each run starts a fresh interpreter on PRO.PY, feeds it one prompt and
+measures the wall time until the first outfit line is printed. Runs happen
+in a scratch directory with BROWSER set to a no-op, so no window opens and
+no page is left behind. The import time of the engine module alone is
+measured the same way for comparison.
+
+Usage: python bench_startup.py [--runs 10] [--prompt "office meeting"] [--json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from engine_loader import ENGINE_PATH
+
+BASE_DIR = os.path.dirname(ENGINE_PATH)
+IMPORT_SNIPPET = "import engine_loader; engine_loader.load_engine()"
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONUNBUFFERED"] = "1"
+    env["PYTHONPATH"] = BASE_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    env["BROWSER"] = "true"
+    return env
+
+
+def time_first_recommendation(prompt: str, workdir: str) -> float:
+    """Seconds from process spawn until the CLI prints its first outfit"""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, ENGINE_PATH], cwd=workdir, env=_env(),
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    proc.stdin.write(prompt + "\nexit\n")
+    proc.stdin.flush()
+    elapsed = None
+    for line in proc.stdout:
+        if line.startswith("Outfit 1"):
+            elapsed = time.perf_counter() - start
+            break
+    proc.stdout.read()
+    proc.wait()
+    if elapsed is None:
+        raise RuntimeError(f"CLI produced no outfit for prompt {prompt!r} (exit code {proc.returncode})")
+    return elapsed
+
+
+def time_engine_import(workdir: str) -> float:
+    """Seconds for a fresh interpreter to import the engine module and exit"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=workdir, env=_env(), check=True)
+    return time.perf_counter() - start
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    return {
+        "min_ms": round(min(samples) * 1000, 1),
+        "median_ms": round(statistics.median(samples) * 1000, 1),
+        "max_ms": round(max(samples) * 1000, 1),
+    }
+
+
+def run(runs: int = 10, prompt: str = "office meeting") -> Dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        first = [time_first_recommendation(prompt, workdir) for _ in range(runs)]
+        imports = [time_engine_import(workdir) for _ in range(runs)]
+    return {
+        "python": sys.version.split()[0],
+        "runs": runs,
+        "prompt": prompt,
+        "time_to_first_recommendation": _summary(first),
+        "engine_import": _summary(imports),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure CLI time-to-first-recommendation")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--prompt", default="office meeting")
+    parser.add_argument("--json", action="store_true", help="print machine-readable JSON")
+    args = parser.parse_args(argv)
+    result = run(args.runs, args.prompt)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    for key in ("time_to_first_recommendation", "engine_import"):
+        stats = result[key]
+        print(f"{key}: min {stats['min_ms']} ms, median {stats['median_ms']} ms, max {stats['max_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""Streaming bulk import of wardrobe catalogs (CSV or JSONL) with validation.
+
+Records are read in chunks and normalised in parallel worker processes, with
+at most a few chunks in flight, so memory stays bounded by the chunk size
+rather than the catalog:
+
+- tags are lower-cased, stripped and de-duplicated (first occurrence wins);
+  in CSV they are one column separated by commas, semicolons or pipes, or a
+  JSON list
+- the fields SmartOutfitRecommender._initialize_wardrobe fills in (tags,
+  category) get the same defaults
+- an item needs an id and a name, its category must be one of CATEGORIES,
+  and ids must be unique (within the input, and with the items already in a
+  .db store being appended to)
+
+Valid items are written in input order, in the format the output's extension
+names: .jsonl or .json (wardrobe_file), .snap (wardrobe_snapshot; the items
+are held until the snapshot is written) or .db (wardrobe_sqlite, appended to
+chunk by chunk). Rejected records go to an error report, one JSON line each:
+
+    {"line": 12, "id": "DRSM0042", "errors": ["category 'shoes' is not one of topwear, bottomwear, one_piece, layer"]}
+
+    python bulk_import.py catalog.csv wardrobe.jsonl --errors rejected.jsonl --workers 4
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+CATEGORIES = ("topwear", "bottomwear", "one_piece", "layer")
+DEFAULT_CHUNK_SIZE = 1000
+_TAG_SEPARATORS = str.maketrans({";": ",", "|": ","})
+
+# (line number, raw record or None, parse error or None)
+Record = Tuple[int, Optional[Dict], Optional[str]]
+
+
+def normalize_tags(tags) -> List[str]:
+    """Lower-cased, stripped, de-duplicated tags in first-seen order"""
+    if tags is None:
+        return []
+    if isinstance(tags, str):
+        text = tags.strip()
+        if text.startswith("["):
+            tags = json.loads(text)
+        else:
+            tags = text.translate(_TAG_SEPARATORS).split(",")
+    if not isinstance(tags, list):
+        raise ValueError(f"tags must be a list or a separated string, not {type(tags).__name__}")
+    seen = {}
+    for tag in tags:
+        if not isinstance(tag, str):
+            raise ValueError(f"tag {tag!r} is not a string")
+        tag = tag.strip().lower()
+        if tag:
+            seen.setdefault(tag, None)
+    return list(seen)
+
+
+def normalize_item(raw: Dict) -> Tuple[Dict, List[str]]:
+    """The item as it will be stored, and what is wrong with it (empty if valid)"""
+    errors = []
+    item = {key: value for key, value in raw.items() if value is not None and value != ""}
+    try:
+        item["tags"] = normalize_tags(item.get("tags"))
+    except ValueError as e:
+        errors.append(f"bad tags: {e}")
+        item["tags"] = []
+    category = item.get("category", "unknown")
+    item["category"] = category.strip().lower() if isinstance(category, str) else category
+    if "id" not in item:
+        errors.append("missing id")
+    elif isinstance(item["id"], bool) or not isinstance(item["id"], (str, int)):
+        errors.append(f"id {item['id']!r} is not a string or integer")
+    if not isinstance(item.get("name"), str):
+        errors.append("missing name")
+    if item["category"] not in CATEGORIES:
+        errors.append(f"category {item['category']!r} is not one of {', '.join(CATEGORIES)}")
+    return item, errors
+
+
+def iter_records(path: str) -> Iterator[Record]:
+    """Raw records of a CSV (header row) or JSONL file, with their line numbers"""
+    if path.endswith(".csv"):
+        with open(path, encoding="utf-8", newline="") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                # Extra cells beyond the header land under None
+                row.pop(None, None)
+                yield reader.line_num, {key.strip(): value.strip() if isinstance(value, str) else value
+                                        for key, value in row.items()}, None
+        return
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_no, None, f"invalid JSON ({e})"
+                continue
+            if isinstance(record, dict):
+                yield line_no, record, None
+            else:
+                yield line_no, None, "not a JSON object"
+
+
+def _chunks(records: Iterable[Record], size: int) -> Iterator[List[Record]]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _normalize_chunk(chunk: List[Record]) -> List[Tuple[int, Optional[Dict], List[str]]]:
+    out = []
+    for line, raw, error in chunk:
+        if error is not None:
+            out.append((line, None, [error]))
+        else:
+            item, errors = normalize_item(raw)
+            out.append((line, item, errors))
+    return out
+
+
+def _map_chunks(chunks: Iterator[List[Record]], workers: int) -> Iterator[List]:
+    """_normalize_chunk over chunks, in order, with at most 2 * workers chunks in flight"""
+    if workers <= 1:
+        yield from map(_normalize_chunk, chunks)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_normalize_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# --- writers: write(items) per chunk, then commit() or abort() ---
+class _JsonWriter:
+    """.jsonl or .json, streamed to a temporary file that replaces the target on commit"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lines = path.endswith(".jsonl")
+        fd, self.tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        self.f = os.fdopen(fd, "w", encoding="utf-8")
+        self.count = 0
+        if not self.lines:
+            self.f.write("[")
+
+    def write(self, items: List[Dict]) -> None:
+        for item in items:
+            text = json.dumps(item, separators=(",", ":"), ensure_ascii=False)
+            if self.lines:
+                self.f.write(text + "\n")
+            else:
+                self.f.write(("," if self.count else "") + text)
+            self.count += 1
+
+    def commit(self) -> None:
+        if not self.lines:
+            self.f.write("]")
+        self.f.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self) -> None:
+        self.f.close()
+        os.remove(self.tmp_path)
+
+
+class _SnapshotWriter:
+    def __init__(self, path: str):
+        self.path = path
+        self.items: List[Dict] = []
+
+    def write(self, items: List[Dict]) -> None:
+        self.items.extend(items)
+
+    def commit(self) -> None:
+        from wardrobe_snapshot import write_snapshot
+        write_snapshot(self.items, self.path)
+
+    def abort(self) -> None:
+        self.items = []
+
+
+class _StoreWriter:
+    def __init__(self, path: str):
+        from wardrobe_sqlite import WardrobeStore
+        self.store = WardrobeStore(path)
+
+    def existing_ids(self) -> set:
+        with self.store.pool.connection() as conn:
+            return {item_id for (item_id,) in conn.execute("SELECT id FROM items WHERE id IS NOT NULL")}
+
+    def write(self, items: List[Dict]) -> None:
+        self.store.add_items(items)
+
+    def commit(self) -> None:
+        self.store.close()
+
+    def abort(self) -> None:
+        # Chunks already added stay: each was its own transaction
+        self.store.close()
+
+
+def open_writer(path: str):
+    if path.endswith((".json", ".jsonl")):
+        return _JsonWriter(path)
+    if path.endswith(".snap"):
+        return _SnapshotWriter(path)
+    if path.endswith((".db", ".sqlite")):
+        return _StoreWriter(path)
+    raise ValueError(f"{path}: unknown output format (use .jsonl, .json, .snap or .db)")
+
+
+def import_catalog(source: str, out: str, workers: int = 1, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   error_path: Optional[str] = None) -> Dict:
+    """Import source into out; returns counts (read, imported, rejected)"""
+    writer = open_writer(out)
+    seen = writer.existing_ids() if isinstance(writer, _StoreWriter) else set()
+    errors = open(error_path, "w", encoding="utf-8") if error_path else None
+    read = imported = rejected = 0
+    try:
+        for results in _map_chunks(_chunks(iter_records(source), chunk_size), workers):
+            valid = []
+            for line, item, problems in results:
+                read += 1
+                if item is not None and not problems:
+                    if item["id"] in seen:
+                        problems = [f"duplicate id {item['id']!r}"]
+                    else:
+                        seen.add(item["id"])
+                        valid.append(item)
+                        continue
+                rejected += 1
+                if errors is not None:
+                    record = {"line": line, "id": item.get("id") if item else None, "errors": problems}
+                    errors.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            if valid:
+                writer.write(valid)
+                imported += len(valid)
+    except BaseException:
+        writer.abort()
+        raise
+    finally:
+        if errors is not None:
+            errors.close()
+    writer.commit()
+    return {"source": source, "output": out, "read": read, "imported": imported, "rejected": rejected}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import a CSV/JSONL catalog into a wardrobe file, snapshot or store")
+    parser.add_argument("source", help="catalog file (.csv with a header row, or .jsonl)")
+    parser.add_argument("out", help="output: .jsonl, .json, .snap or .db (a .db store is appended to)")
+    parser.add_argument("--errors", help="write rejected records here (JSONL)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    try:
+        summary = import_catalog(args.source, args.out, args.workers, args.chunk_size, args.errors)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    print(json.dumps(summary))
+    return 1 if summary["rejected"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""Tag x category counts for O(1) strategy feasibility checks.
+
+CardinalityCatalog keeps, for the wardrobe, how many items of each category
+carry each tag. It is updated item by item (add/remove), so it stays exact
+as the wardrobe changes without rescanning.
+
+may_fill() answers "could this strategy build any outfit?" from the counts
+alone, reading the strategy's pools and shapes from occasion_rules. It is a
+necessary condition: exclusion tags are ignored and a strategy that reads
+filtered items is checked against the whole wardrobe, so a False means the
+strategy certainly returns nothing and can be skipped, while a True still
+needs the candidate pools to be built.
+"""
+
+from collections import Counter
+from typing import Dict, Iterable
+
+
+class CardinalityCatalog:
+    """Exact per-(tag, category) item counts, maintained incrementally"""
+
+    def __init__(self, items: Iterable[Dict] = ()):
+        self.pairs: Counter = Counter()
+        self.categories: Counter = Counter()
+        self.tags: Counter = Counter()
+        self.size = 0
+        for item in items:
+            self.add(item)
+
+    def add(self, item: Dict) -> None:
+        category = item.get("category", "unknown")
+        self.size += 1
+        self.categories[category] += 1
+        for tag in set(item.get("tags", [])):
+            self.tags[tag] += 1
+            self.pairs[(tag, category)] += 1
+
+    def remove(self, item: Dict) -> None:
+        """Undo add(item); the item must be passed with the tags it was added with"""
+        category = item.get("category", "unknown")
+        self.size -= 1
+        self.categories[category] -= 1
+        for tag in set(item.get("tags", [])):
+            self.tags[tag] -= 1
+            self.pairs[(tag, category)] -= 1
+
+    def merge(self, other: "CardinalityCatalog") -> None:
+        """Add other's counts (a catalog of other items, e.g. another shard's) to these"""
+        self.size += other.size
+        self.pairs.update(other.pairs)
+        self.categories.update(other.categories)
+        self.tags.update(other.tags)
+
+    def count(self, category: str, tag: str) -> int:
+        return self.pairs.get((tag, category), 0)
+
+    def any_count(self, category: str, tags: Iterable[str]) -> int:
+        """Upper bound on items of category carrying any of tags (items with several are counted more than once)"""
+        pairs = self.pairs
+        return sum(pairs.get((tag, category), 0) for tag in tags)
+
+    def selectivity(self, category: str, tags: Iterable[str]) -> float:
+        """Estimated fraction of the wardrobe matching category and any of tags"""
+        if not self.size:
+            return 0.0
+        return min(self.any_count(category, tags), self.categories.get(category, 0)) / self.size
+
+    def may_fill(self, strategy, occasions) -> bool:
+        """False if the strategy (an occasion_rules.Strategy) certainly cannot build an outfit for these occasions"""
+        pools = strategy.pools(occasions)
+        categories = self.categories
+        for shape in strategy.shapes:
+            ok = True
+            for name in shape:
+                pool = pools[name]
+                if pool.expand_from is not None:
+                    # any_of grows with the wardrobe's own tags, so only the category is known
+                    ok = categories.get(pool.category, 0) > 0
+                else:
+                    ok = self.any_count(pool.category, pool.any_of) > 0
+                if not ok:
+                    break
+            if ok:
+                return True
+        return False
@@ -0,0 +1,184 @@
+"""Wardrobe coverage per occasion strategy and color, computed on the tag index.
+
+For every occasion the engine recognises and every color in color_variants
+this works out, with bitset operations only, which strategy branch of
+get_unique_outfits would run and how many tops, bottoms, one-pieces, layers
+and full outfits it has to choose from:
+
+    color_priority   the color-first pass (occasion items that match the
+                     color by tag or name, run through the strategy again)
+    strategy         the strategy branch itself with the color filter
+
+A color_priority entry with no outfits is the "wedding in green falls back"
+case. The engine uses route_feasible() through the same functions to skip the
+throwaway color-priority recommender when it could not produce anything.
+
+Routes, pools and shapes come from occasion_rules, the same compiled rules
+the engine dispatches on, so the matrix cannot drift from the engine.
+
+Usage:
+    python coverage_matrix.py [--wardrobe items.jsonl] [--out coverage.json] [--only-gaps]
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, List, Optional, Sequence
+
+from occasion_rules import RULES, OccasionRules, PoolSelection, Strategy
+from query_planner import CandidatePlanner
+from tag_index import TagIndex
+
+CATEGORIES = {"tops": "topwear", "bottoms": "bottomwear", "one_pieces": "one_piece", "layers": "layer"}
+
+
+def occasion_bits(index: TagIndex, occasions, rules: OccasionRules = RULES) -> int:
+    """Bitset of filter_items_by_occasion(occasions)"""
+    return rules.occasion_bits(index, occasions)
+
+
+def color_bits(index: TagIndex, color_variants, whole_words: bool = False) -> int:
+    """Items matching any color variant by tag, or by name: substring, or whole word as filter_by_requirements does"""
+    bits = index.any_tag(color_variants)
+    name_match = index.name_word if whole_words else index.name_contains
+    for color in color_variants:
+        bits |= name_match(color)
+    return bits
+
+
+def route(occasions, rules: OccasionRules = RULES) -> List[str]:
+    """Names of the strategies _strategy_outfits tries for these occasions, in order"""
+    return [strategy.name for strategy in rules.route(occasions)]
+
+
+def strategy_pools(index: TagIndex, strategy, occasions, filtered: int, rules: OccasionRules = RULES) -> PoolSelection:
+    """Candidate pools of one strategy (a name or occasion_rules.Strategy) over index.
+
+    Strategies that read the whole wardrobe ignore `filtered`; the others
+    select inside it (the occasion/requirement filtered items).
+    """
+    if isinstance(strategy, str):
+        if strategy not in rules.strategies:
+            raise ValueError(f"unknown strategy {strategy!r}")
+        strategy = rules.strategies[strategy]
+    return strategy.select(CandidatePlanner(index), occasions, filtered)
+
+
+def outfit_count(pools: PoolSelection) -> int:
+    """Distinct outfits (ignoring optional layers) the strategy could build"""
+    total = 0
+    for shape in pools.strategy.shapes:
+        product = 1
+        for name in shape:
+            product *= pools.bits(name).bit_count()
+        total += product
+    return total
+
+
+def route_feasible(index: TagIndex, occasions, filtered: Optional[int] = None, rules: OccasionRules = RULES) -> bool:
+    """Whether _strategy_outfits over this index returns anything (filtered defaults to the occasion items)"""
+    if filtered is None:
+        filtered = rules.occasion_bits(index, occasions)
+    planner = CandidatePlanner(index)
+    for strategy in rules.route(occasions):
+        if strategy.select(planner, occasions, filtered).can_fill():
+            return True
+    return False
+
+
+def color_priority_index(index: TagIndex, occasions, color_variants,
+                         rules: OccasionRules = RULES) -> Optional[TagIndex]:
+    """The items _build_color_priority_outfits hands to its inner recommender, or None if there are none"""
+    bits = rules.occasion_bits(index, occasions) & color_bits(index, color_variants)
+    return index.subset(bits) if bits else None
+
+
+def _cell(index: TagIndex, occasions, filtered: int) -> Dict:
+    planner = CandidatePlanner(index)
+    chosen: Optional[Strategy] = None
+    pools = None
+    for strategy in RULES.route(occasions):
+        chosen, pools = strategy, strategy.select(planner, occasions, filtered)
+        if pools.can_fill():
+            break
+    counts = {}
+    for name in CATEGORIES:
+        bits = 0
+        if pools is not None:
+            for pool_name in (name, "formal_" + name):
+                if pool_name in pools:
+                    bits |= pools.bits(pool_name)
+        counts[name] = bits.bit_count()
+    counts["outfits"] = outfit_count(pools) if pools is not None else 0
+    return {"strategy": chosen.name if chosen else "unmatched", **counts}
+
+
+def coverage(recommender, prompts: Sequence[str]) -> Dict:
+    """Coverage matrix for the occasions detected in prompts x every color in color_variants"""
+    index = TagIndex(recommender.wardrobe_db)
+    matrix = {}
+    for prompt in prompts:
+        occasions = recommender.analyze_occasion(prompt)
+        label = " & ".join(occasions)
+        if label in matrix:
+            continue
+        occ_bits = occasion_bits(index, occasions)
+        row = {}
+        for color in recommender.color_variants:
+            variants = recommender._expand_color_requirements(color)
+            sub = color_priority_index(index, occasions, variants)
+            color_priority = _cell(sub, occasions, sub.all) if sub else {"strategy": "none", "outfits": 0}
+            strategy = _cell(index, occasions, occ_bits & color_bits(index, variants, whole_words=True))
+            row[color] = {"color_priority": color_priority, "strategy": strategy}
+        matrix[label] = row
+    return matrix
+
+
+def lookup_table(matrix: Dict) -> Dict[str, Dict[str, bool]]:
+    """occasion -> color -> whether the color-priority pass can return an outfit"""
+    return {label: {color: cell["color_priority"]["outfits"] > 0 for color, cell in row.items()}
+            for label, row in matrix.items()}
+
+
+# Prompts covering every occasion analyze_occasion can return
+REPORT_PROMPTS = [
+    "office", "business meeting", "interview", "funeral", "party", "office party", "beach party", "wedding",
+    "date", "ritual", "festival", "office ritual", "casual", "picnic", "shopping", "swimming", "gym", "hiking",
+    "trekking", "yoga", "camping", "running", "cycling", "something nice",
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Occasion x color coverage of the wardrobe")
+    parser.add_argument("--wardrobe", help="wardrobe file (.json/.jsonl) instead of the bundled wardrobe_db")
+    parser.add_argument("--out", help="write the full matrix and lookup table as JSON")
+    parser.add_argument("--only-gaps", action="store_true", help="only print occasion/color pairs without outfits")
+    args = parser.parse_args(argv)
+
+    from engine_loader import load_engine
+    engine = load_engine()
+    wardrobe = engine.wardrobe_db
+    if args.wardrobe:
+        from wardrobe_file import load_wardrobe
+        wardrobe = load_wardrobe(args.wardrobe)
+    matrix = coverage(engine.SmartOutfitRecommender(wardrobe), REPORT_PROMPTS)
+
+    print(f"{'occasion':<20} {'color':<10} {'strategy':<16} {'tops':>6} {'bottoms':>7} {'1-piece':>7} "
+          f"{'layers':>6} {'outfits':>9}  color-first")
+    for label, row in matrix.items():
+        for color, cell in row.items():
+            first = cell["color_priority"]
+            if args.only_gaps and first["outfits"]:
+                continue
+            s = cell["strategy"]
+            print(f"{label:<20} {color:<10} {s['strategy']:<16} {s['tops']:>6} {s['bottoms']:>7} "
+                  f"{s['one_pieces']:>7} {s['layers']:>6} {s['outfits']:>9}  "
+                  f"{first['outfits'] if first['outfits'] else 'none -> fallback'}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"matrix": matrix, "lookup": lookup_table(matrix)}, f, indent=1)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
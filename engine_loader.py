@@ -0,0 +1,30 @@
+"""Import helper for the recommender engine in PRO.PY.
+
+PRO.PY is the working engine, but its upper-case extension keeps the normal
+import system from finding it on case-sensitive filesystems. Tools load it
+through here instead; the module is registered as "PRO" and loaded once.
+"""
+
+import importlib.util
+import os
+import sys
+from importlib.machinery import SourceFileLoader
+
+ENGINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "PRO.PY")
+
+
+def load_engine():
+    """Return the PRO.PY module (SmartOutfitRecommender, wardrobe_db, ...)"""
+    module = sys.modules.get("PRO")
+    if module is not None:
+        return module
+    loader = SourceFileLoader("PRO", ENGINE_PATH)
+    spec = importlib.util.spec_from_loader("PRO", loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["PRO"] = module
+    try:
+        loader.exec_module(module)
+    except BaseException:
+        del sys.modules["PRO"]
+        raise
+    return module
@@ -0,0 +1,197 @@
+"""Hot reload of a wardrobe file with an atomic engine swap.
+
+WardrobeWatcher polls a wardrobe file's mtime and size (os.stat, no external
+dependencies). When they change and then hold still for one more poll (so a
+file being written in place is not read half-way), it loads the file and
+builds a new, warmed recommender on its own thread. Only then does it publish
+the result as the EngineHolder's snapshot, with a single attribute
+assignment.
+
+Requests read the holder's snapshot once and run entirely on it. In-flight
+requests finish on the old snapshot, new ones pick up the new one, and
+nothing waits for a rebuild. If the file fails to load, the old snapshot
+stays in service and the error is kept in last_error.
+
+    watcher = WardrobeWatcher("wardrobe.jsonl", interval=2.0).start()
+    result = watcher.holder.recommend_outfits("party in red")
+    ...
+    watcher.stop()
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from engine_loader import load_engine
+from wardrobe_file import load_wardrobe
+
+DEFAULT_INTERVAL = 2.0
+# Run through a new engine before it is published, so name caches, rule masks and
+# color-priority lookups are warm for the first real requests
+DEFAULT_WARM_PROMPTS = ("party in red", "office meeting", "casual outing in blue", "gym", "ritual in gold")
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """(mtime in ns, size) of path, or None if it cannot be stat'ed"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class EngineSnapshot:
+    """One loaded wardrobe and a warm recommender over it; read-only once published"""
+
+    def __init__(self, generation: int, path: Optional[str], signature: Optional[Tuple[int, int]], recommender):
+        self.generation = generation
+        self.path = path
+        self.signature = signature
+        self.recommender = recommender
+        self.loaded_at = time.time()
+
+    @property
+    def items(self):
+        return self.recommender.wardrobe_db
+
+    def describe(self) -> Dict:
+        return {"generation": self.generation, "path": self.path, "items": len(self.items),
+                "loaded_at": self.loaded_at}
+
+
+def build_snapshot(path: str, generation: int, warm_prompts: Sequence[str] = DEFAULT_WARM_PROMPTS,
+                   engine=None) -> EngineSnapshot:
+    """Load path (a wardrobe file or a .snap snapshot) and build a warmed recommender over it"""
+    # Stat before reading: if the file changes during the load, the next poll sees a new signature
+    signature = file_signature(path)
+    engine = engine or load_engine()
+    if path.endswith(".snap"):
+        recommender = engine.SmartOutfitRecommender.from_snapshot(path).warm()
+    else:
+        recommender = engine.SmartOutfitRecommender(load_wardrobe(path)).warm()
+    for prompt in warm_prompts:
+        recommender.recommend_outfits(prompt)
+    return EngineSnapshot(generation, path, signature, recommender)
+
+
+class EngineHolder:
+    """The current EngineSnapshot, swapped atomically, plus per-thread recommenders over it"""
+
+    def __init__(self, snapshot: EngineSnapshot):
+        self._snapshot = snapshot
+        self._local = threading.local()
+
+    @property
+    def snapshot(self) -> EngineSnapshot:
+        return self._snapshot
+
+    def swap(self, snapshot: EngineSnapshot) -> EngineSnapshot:
+        """Publish snapshot and return the one it replaces"""
+        old, self._snapshot = self._snapshot, snapshot
+        return old
+
+    def recommender(self, snapshot: Optional[EngineSnapshot] = None):
+        """This thread's recommender over snapshot (default: the current one)"""
+        snapshot = snapshot or self._snapshot
+        local = self._local
+        if getattr(local, "snapshot", None) is not snapshot:
+            # Shares the snapshot's index and caches; keeps this thread's own recent-outfit history
+            local.recommender = snapshot.recommender.sibling()
+            local.snapshot = snapshot
+        return local.recommender
+
+    def recommend_outfits(self, prompt: str, **kwargs) -> Dict:
+        snapshot = self._snapshot  # read once: the whole request runs on this snapshot
+        return self.recommender(snapshot).recommend_outfits(prompt, **kwargs)
+
+
+class WardrobeWatcher:
+    """Polls a wardrobe file and swaps a freshly built engine into holder when it changes"""
+
+    def __init__(self, path: str, holder: Optional[EngineHolder] = None, interval: float = DEFAULT_INTERVAL,
+                 warm_prompts: Sequence[str] = DEFAULT_WARM_PROMPTS,
+                 on_reload: Optional[Callable[[EngineSnapshot, EngineSnapshot], None]] = None,
+                 on_error: Optional[Callable[[Exception], None]] = None):
+        self.path = path
+        self.interval = interval
+        self.warm_prompts = warm_prompts
+        self.on_reload = on_reload
+        self.on_error = on_error
+        self._engine = load_engine()
+        # The first load is synchronous: there is nothing to serve until it is done
+        self.holder = holder or EngineHolder(build_snapshot(path, 1, warm_prompts, self._engine))
+        self.reloads = 0
+        self.failures = 0
+        self.last_error: Optional[Exception] = None
+        self._pending: Optional[Tuple[int, int]] = None
+        self._failed: Optional[Tuple[int, int]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check(self) -> bool:
+        """Poll once; rebuild and swap if the file changed and has settled. Returns True on a swap."""
+        signature = file_signature(self.path)
+        if signature is None or signature == self.holder.snapshot.signature or signature == self._failed:
+            self._pending = None
+            return False
+        if signature != self._pending:
+            # Changed since the last poll: wait for it to hold still before reading it
+            self._pending = signature
+            return False
+        self._pending = None
+        old = self.holder.snapshot
+        try:
+            snapshot = build_snapshot(self.path, old.generation + 1, self.warm_prompts, self._engine)
+        except Exception as e:
+            # Any bad wardrobe (a null name, a wrong type, ...): keep serving the old one and
+            # don't retry this version of the file
+            self._failed = signature
+            self._error(e)
+            return False
+        self.holder.swap(snapshot)
+        self.reloads += 1
+        self.last_error = None
+        if self.on_reload is not None:
+            self.on_reload(old, snapshot)
+        return True
+
+    def _error(self, e: Exception) -> None:
+        self.failures += 1
+        self.last_error = e
+        if self.on_error is not None:
+            self.on_error(e)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                # A failing callback or stat must not end the polling thread
+                try:
+                    self._error(e)
+                except Exception:
+                    pass
+
+    def start(self) -> "WardrobeWatcher":
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="wardrobe-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> Dict:
+        return {"snapshot": self.holder.snapshot.describe(), "reloads": self.reloads, "failures": self.failures,
+                "last_error": str(self.last_error) if self.last_error else None}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,122 @@
+"""Image manifest for static/: size, content hash and dimensions per file.
+
+The manifest is written to static/manifest.json and reused across runs; a
+refresh only re-hashes files whose mtime or size moved. The renderer keeps
+the loaded manifest in memory, so it can add cache-busting ?v= hashes to
+image URLs and leave out images that do not exist without touching the
+filesystem per request.
+
+Usage: python image_manifest.py [--static static] [--check]
+"""
+
+import argparse
+import json
+import os
+import struct
+import tempfile
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from thumbnails import IMAGE_EXTENSIONS, STATIC_DIR, file_sha256
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_PATH = os.path.join(STATIC_DIR, MANIFEST_NAME)
+# SOF markers carry the frame size; C4 (DHT), C8 (JPG) and CC (DAC) do not
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def image_dimensions(path: str) -> Optional[Tuple[int, int]]:
+    """Read (width, height) from a JPEG or PNG header; None if unrecognised"""
+    with open(path, "rb") as f:
+        head = f.read(24)
+        if head[:8] == b"\x89PNG\r\n\x1a\n" and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if head[:2] != b"\xff\xd8":
+            return None
+        f.seek(2)
+        while True:
+            byte = f.read(1)
+            while byte and byte != b"\xff":
+                byte = f.read(1)
+            while byte == b"\xff":
+                byte = f.read(1)
+            if not byte:
+                return None
+            marker = byte[0]
+            if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+                continue
+            length_bytes = f.read(2)
+            if len(length_bytes) < 2:
+                return None
+            length = struct.unpack(">H", length_bytes)[0]
+            if marker in _JPEG_SOF:
+                data = f.read(5)
+                if len(data) < 5:
+                    return None
+                height, width = struct.unpack(">HH", data[1:5])
+                return width, height
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def load_manifest(path: str = MANIFEST_PATH) -> Dict[str, Dict]:
+    """Load the manifest (filename -> entry) without scanning; empty if never built"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def refresh_manifest(static_dir: str = STATIC_DIR, path: Optional[str] = None,
+                     write: bool = True) -> Dict[str, Dict]:
+    """Scan static_dir once, reusing entries whose mtime and size are unchanged"""
+    path = path or os.path.join(static_dir, MANIFEST_NAME)
+    old = load_manifest(path)
+    manifest = {}
+    for entry in os.scandir(static_dir):
+        if not entry.is_file() or not entry.name.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        st = entry.stat()
+        cached = old.get(entry.name)
+        if cached and cached["mtime"] == st.st_mtime and cached["size"] == st.st_size:
+            manifest[entry.name] = cached
+            continue
+        dims = image_dimensions(entry.path)
+        manifest[entry.name] = {
+            "mtime": st.st_mtime,
+            "size": st.st_size,
+            "sha256": file_sha256(entry.path),
+            "width": dims[0] if dims else None,
+            "height": dims[1] if dims else None,
+        }
+    if write and manifest != old:
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, path)
+        except OSError:
+            # A read-only static/ still gets an in-memory manifest
+            pass
+    return manifest
+
+
+def missing_images(items: Iterable[Dict], manifest: Dict[str, Dict]) -> List[Dict]:
+    """Return the items whose image is not in the manifest"""
+    return [item for item in items if item.get("image", "") not in manifest]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or refresh the static/ image manifest")
+    parser.add_argument("--static", default=STATIC_DIR, help="directory with the item images")
+    parser.add_argument("--check", action="store_true", help="report wardrobe items whose image is missing")
+    args = parser.parse_args(argv)
+    manifest = refresh_manifest(args.static)
+    print(f"Manifest: {len(manifest)} images in {args.static}")
+    if args.check:
+        from engine_loader import load_engine
+        for item in missing_images(load_engine().wardrobe_db, manifest):
+            print(f"  missing image for {item['id']}: {item.get('image', '')!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""Offline aggregation over recommendation logs written by reco_log.py.
+
+Each log file (shard) is streamed line by line in a worker process and
+summarised into a mergeable ShardSummary; the summaries are merged into one
+report:
+
+    - top occasions (exact; a small set) and color-request frequency (the
+      engine's COLOR_VARIANTS colors only, in a count-min sketch)
+    - prompts that returned fewer than 3 outfits (count-min sketch estimates
+      for a bounded set of heavy-hitter candidates, HyperLogLog for how many
+      distinct prompts were affected)
+    - most and least recommended item ids (count-min sketch; "least" is taken
+      over the wardrobe, streamed, so never-recommended items show up with 0)
+    - distinct prompts / distinct recommended items (HyperLogLog)
+
+Memory per worker is fixed by the sketch sizes and the candidate limit, not
+by the log volume. Count-min estimates never under-count and over-count by
+at most ~e/width of the total with probability 1 - e^-depth.
+
+Usage:
+    python log_analytics.py logs/ [--workers 4] [--top 20] [--wardrobe items.jsonl]
+"""
+
+import argparse
+import glob
+import hashlib
+import heapq
+import json
+import math
+import os
+import sys
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from engine_loader import load_engine
+
+DEFAULT_TOP = 20
+CMS_WIDTH = 1 << 14
+CMS_DEPTH = 4
+HLL_PRECISION = 12
+CANDIDATES = 1000
+FULL_OUTFIT_COUNT = 3
+_colors: Optional[FrozenSet[str]] = None
+
+
+def known_colors() -> FrozenSet[str]:
+    """The colors the engine recognises (COLOR_VARIANTS keys), loaded once per process"""
+    global _colors
+    if _colors is None:
+        _colors = frozenset(load_engine().COLOR_VARIANTS)
+    return _colors
+
+
+def _hash64(key: str, salt: bytes = b"") -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8, salt=salt).digest(), "little")
+
+
+class CountMinSketch:
+    """Approximate counts in depth x width counters; estimates are upper bounds"""
+
+    __slots__ = ("width", "depth", "rows", "total")
+
+    def __init__(self, width: int = CMS_WIDTH, depth: int = CMS_DEPTH):
+        self.width = width
+        self.depth = depth
+        self.rows = [[0] * width for _ in range(depth)]
+        self.total = 0
+
+    def _columns(self, key: str):
+        # Kirsch-Mitzenmacher: depth hash functions from one 128-bit digest
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Count key and return its new estimate"""
+        estimate = None
+        for row, col in zip(self.rows, self._columns(key)):
+            row[col] += count
+            if estimate is None or row[col] < estimate:
+                estimate = row[col]
+        self.total += count
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        return min(row[col] for row, col in zip(self.rows, self._columns(key)))
+
+    def merge(self, other: "CountMinSketch") -> None:
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("cannot merge count-min sketches of different shapes")
+        for row, other_row in zip(self.rows, other.rows):
+            for i, value in enumerate(other_row):
+                if value:
+                    row[i] += value
+        self.total += other.total
+
+
+class HyperLogLog:
+    """Distinct-count estimator with 2**precision registers (~1.04/sqrt(m) relative error)"""
+
+    __slots__ = ("precision", "registers")
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, key: str) -> None:
+        h = _hash64(key, b"hll")
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # linear counting for small cardinalities
+        return int(round(estimate))
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if self.precision != other.precision:
+            raise ValueError("cannot merge HyperLogLogs of different precision")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+
+class HeavyHitters:
+    """Count-min sketch plus a bounded set of keys with the largest estimates"""
+
+    __slots__ = ("sketch", "candidates", "limit")
+
+    def __init__(self, limit: int = CANDIDATES, width: int = CMS_WIDTH, depth: int = CMS_DEPTH):
+        self.sketch = CountMinSketch(width, depth)
+        self.candidates: Dict[str, int] = {}
+        self.limit = limit
+
+    def add(self, key: str, count: int = 1) -> None:
+        self.candidates[key] = self.sketch.add(key, count)
+        if len(self.candidates) > 2 * self.limit:
+            self._prune()
+
+    def _prune(self) -> None:
+        keep = sorted(self.candidates.items(), key=lambda kv: (-kv[1], kv[0]))[:self.limit]
+        self.candidates = dict(keep)
+
+    def merge(self, other: "HeavyHitters") -> None:
+        self.sketch.merge(other.sketch)
+        keys = set(self.candidates) | set(other.candidates)
+        self.candidates = {key: self.sketch.estimate(key) for key in keys}
+        self._prune()
+
+    def top(self, n: int) -> List[Tuple[str, int]]:
+        return sorted(self.candidates.items(), key=lambda kv: (-kv[1], kv[0]))[:n]
+
+
+class ShardSummary:
+    """Everything the report needs from one or more log files; merge() combines shards"""
+
+    def __init__(self):
+        self.records = 0
+        self.bad_lines = 0
+        self.files = 0
+        self.occasions: Counter = Counter()
+        self.strategies: Counter = Counter()
+        self.colors = HeavyHitters(limit=64)
+        self.short_responses = 0
+        self.short_prompts = HeavyHitters()
+        self.short_distinct = HyperLogLog()
+        self.items = HeavyHitters()
+        self.distinct_prompts = HyperLogLog()
+        self.distinct_items = HyperLogLog()
+
+    def add(self, record: Dict) -> None:
+        self.records += 1
+        prompt = (record.get("prompt") or "").strip().lower()
+        self.distinct_prompts.add(prompt)
+        self.occasions[" & ".join(record.get("occasions") or []) or "unknown"] += 1
+        self.strategies[record.get("strategy") or "unknown"] += 1
+        colors = known_colors()
+        for color in record.get("required") or []:
+            # required also holds non-color requirements; only colors are counted
+            if color in colors:
+                self.colors.add(color)
+        outfits = record.get("outfits") or []
+        if len(outfits) < FULL_OUTFIT_COUNT:
+            self.short_responses += 1
+            self.short_prompts.add(prompt)
+            self.short_distinct.add(prompt)
+        for outfit in outfits:
+            for item_id in outfit.get("ids", []):
+                self.items.add(item_id)
+                self.distinct_items.add(item_id)
+
+    def merge(self, other: "ShardSummary") -> None:
+        self.records += other.records
+        self.bad_lines += other.bad_lines
+        self.files += other.files
+        self.occasions.update(other.occasions)
+        self.strategies.update(other.strategies)
+        self.colors.merge(other.colors)
+        self.short_responses += other.short_responses
+        self.short_prompts.merge(other.short_prompts)
+        self.short_distinct.merge(other.short_distinct)
+        self.items.merge(other.items)
+        self.distinct_prompts.merge(other.distinct_prompts)
+        self.distinct_items.merge(other.distinct_items)
+
+
+def summarize_file(path: str) -> ShardSummary:
+    """Stream one log shard into a ShardSummary"""
+    summary = ShardSummary()
+    summary.files = 1
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                summary.bad_lines += 1
+                continue
+            summary.add(record)
+    return summary
+
+
+def log_files(paths: Iterable[str]) -> List[str]:
+    """Expand directories and globs into a sorted list of .jsonl shards"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(glob.glob(os.path.join(path, "*.jsonl")))
+        else:
+            files.extend(glob.glob(path) or [path])
+    return sorted(set(files))
+
+
+def summarize(files: List[str], workers: int = 1) -> ShardSummary:
+    total = ShardSummary()
+    if workers <= 1 or len(files) <= 1:
+        for path in files:
+            total.merge(summarize_file(path))
+        return total
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=min(workers, len(files))) as pool:
+        for summary in pool.map(summarize_file, files):
+            total.merge(summary)
+    return total
+
+
+def build_report(summary: ShardSummary, top: int = DEFAULT_TOP, wardrobe_ids: Optional[Iterable[str]] = None) -> Dict:
+    """The report for summary; wardrobe_ids may be a stream (it is read once, keeping only the top least)"""
+    if wardrobe_ids is None:
+        least = sorted(summary.items.candidates.items(), key=lambda kv: (kv[1], kv[0]))[:top]
+    else:
+        estimate = summary.items.sketch.estimate
+        least = heapq.nsmallest(top, ((item_id, estimate(item_id)) for item_id in wardrobe_ids),
+                                key=lambda kv: (kv[1], kv[0]))
+    return {
+        "files": summary.files,
+        "records": summary.records,
+        "bad_lines": summary.bad_lines,
+        "distinct_prompts_approx": summary.distinct_prompts.count(),
+        "top_occasions": summary.occasions.most_common(top),
+        "strategies": summary.strategies.most_common(),
+        "color_requests": summary.colors.top(len(summary.colors.candidates)),
+        "short_responses": {
+            "responses": summary.short_responses,
+            "distinct_prompts_approx": summary.short_distinct.count(),
+            "top_prompts_approx": summary.short_prompts.top(top),
+        },
+        "items": {
+            "recommended_slots": summary.items.sketch.total,
+            "distinct_recommended_approx": summary.distinct_items.count(),
+            "most_recommended_approx": summary.items.top(top),
+            "least_recommended_approx": least,
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aggregate recommendation JSONL logs")
+    parser.add_argument("paths", nargs="+", help="log files, directories or globs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP)
+    parser.add_argument("--wardrobe", help="wardrobe file for least-recommended items (default: bundled wardrobe_db)")
+    parser.add_argument("--no-wardrobe", action="store_true",
+                        help="rank least-recommended among recommended ids only")
+    args = parser.parse_args(argv)
+
+    files = log_files(args.paths)
+    if not files:
+        parser.error("no log files found")
+    wardrobe_ids = None
+    if args.wardrobe:
+        from wardrobe_file import iter_wardrobe
+        # Streamed straight into build_report: memory stays O(top), not O(wardrobe)
+        wardrobe_ids = (item["id"] for item in iter_wardrobe(args.wardrobe))
+    elif not args.no_wardrobe:
+        wardrobe_ids = (item["id"] for item in load_engine().wardrobe_db)
+    report = build_report(summarize(files, args.workers), args.top, wardrobe_ids)
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Prometheus metrics for the outfit recommender.
+
+MetricsRegistry plugs into recommender.stage_hooks (same interface as
+stage_timing.StageTimer) and counts requests by detected occasion, strategy
+branch, fallback invocations, zero-outfit responses, cache hits/misses and
+per-stage latency histograms.
+
+Every thread writes only to its own shard, so recording takes no lock; a
+scrape merges the shards. serve() exposes the text exposition format on a
+local HTTP endpoint:
+
+    registry = MetricsRegistry()
+    recommender.stage_hooks = registry
+    serve(registry, port=9108)        # GET http://127.0.0.1:9108/metrics
+"""
+
+import threading
+import time
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Sequence, Tuple
+
+from stage_timing import DEFAULT_BUCKETS, Histogram
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Shard:
+    """One thread's private counters and histograms"""
+
+    __slots__ = ("counters", "histograms")
+
+    def __init__(self):
+        self.counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], int] = Counter()
+        self.histograms: Dict[str, Histogram] = {}
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Stage hooks that aggregate per thread and render Prometheus text format"""
+
+    clock = staticmethod(time.perf_counter)
+
+    COUNTERS = {
+        "outfit_requests_total": "Recommendation requests by detected occasion",
+        "outfit_strategy_total": "Requests by strategy branch that produced the outfits",
+        "outfit_fallback_total": "Requests that invoked _generate_fallback_outfits",
+        "outfit_zero_outfit_responses_total": "Requests that returned no outfit",
+        "outfit_cache_lookups_total": "Engine cache lookups by cache and result",
+    }
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS, prefix: str = ""):
+        self.bounds = tuple(bounds)
+        self.prefix = prefix
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    # --- stage hooks interface ---
+    def start(self) -> float:
+        return self.clock()
+
+    def lap(self, stage: str, started: float) -> float:
+        now = self.clock()
+        histograms = self._shard().histograms
+        hist = histograms.get(stage)
+        if hist is None:
+            hist = histograms[stage] = Histogram(self.bounds)
+        hist.observe(now - started)
+        return now
+
+    def event(self, name: str, value) -> None:
+        counters = self._shard().counters
+        if name == "occasion":
+            counters[("outfit_requests_total", (("occasion", value),))] += 1
+        elif name == "strategy":
+            counters[("outfit_strategy_total", (("strategy", value),))] += 1
+        elif name == "fallback":
+            if value:
+                counters[("outfit_fallback_total", ())] += 1
+        elif name == "zero_outfits":
+            if value:
+                counters[("outfit_zero_outfit_responses_total", ())] += 1
+
+    def cache(self, name: str, hit: bool) -> None:
+        result = "hit" if hit else "miss"
+        self._shard().counters[("outfit_cache_lookups_total", (("cache", name), ("result", result)))] += 1
+
+    # --- scraping ---
+    def collect(self) -> Tuple[Counter, Dict[str, Histogram]]:
+        """Merge all thread shards into one set of counters and histograms"""
+        with self._shards_lock:
+            shards = list(self._shards)
+        counters: Counter = Counter()
+        histograms: Dict[str, Histogram] = {}
+        for shard in shards:
+            counters.update(dict(shard.counters))
+            for stage, hist in list(shard.histograms.items()):
+                merged = histograms.get(stage)
+                if merged is None:
+                    merged = histograms[stage] = Histogram(self.bounds)
+                merged.merge(hist)
+        return counters, histograms
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        counters, histograms = self.collect()
+        by_name = defaultdict(list)
+        for (name, labels), value in counters.items():
+            by_name[name].append((labels, value))
+        lines = []
+        for name, help_text in self.COUNTERS.items():
+            full = self.prefix + name
+            lines.append(f"# HELP {full} {help_text}")
+            lines.append(f"# TYPE {full} counter")
+            samples = sorted(by_name.get(name, [])) or [((), 0)]
+            for labels, value in samples:
+                lines.append(f"{full}{_labels(labels)} {value}")
+
+        # Hit ratio per cache, derived from the lookup counter
+        ratio = self.prefix + "outfit_cache_hit_ratio"
+        lines.append(f"# HELP {ratio} Fraction of engine cache lookups that were hits")
+        lines.append(f"# TYPE {ratio} gauge")
+        lookups = defaultdict(lambda: [0, 0])
+        for labels, value in by_name.get("outfit_cache_lookups_total", []):
+            label_map = dict(labels)
+            lookups[label_map["cache"]][label_map["result"] == "hit"] += value
+        for cache_name, (misses, hits) in sorted(lookups.items()):
+            lines.append(f"{ratio}{_labels([('cache', cache_name)])} {_number(hits / (hits + misses))}")
+
+        stage_metric = self.prefix + "outfit_stage_duration_seconds"
+        lines.append(f"# HELP {stage_metric} Time spent in each recommend_outfits stage")
+        lines.append(f"# TYPE {stage_metric} histogram")
+        for stage, hist in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float("inf"),), hist.counts):
+                cumulative += count
+                lines.append(f"{stage_metric}_bucket{_labels([('stage', stage), ('le', _number(bound))])} {cumulative}")
+            lines.append(f"{stage_metric}_sum{_labels([('stage', stage)])} {_number(hist.total)}")
+            lines.append(f"{stage_metric}_count{_labels([('stage', stage)])} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+def serve(registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9108) -> ThreadingHTTPServer:
+    """Serve registry on http://host:port/metrics from a daemon thread; returns the server"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True)
+    thread.start()
+    return server
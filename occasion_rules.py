@@ -0,0 +1,411 @@
+"""Occasion rules: tag sets, occasion keywords and strategy dispatch as data.
+
+occasion_rules.json declares everything the engine used to spell out inline:
+
+    tag_sets           named tag sets ("formal", "party_ethnic", ...)
+    occasion_keywords  prompt words analyze_occasion maps to each occasion
+    occasion_items     the tags filter_items_by_occasion matches per occasion
+    strategies         one entry per strategy: the outfit builder to run, its
+                       candidate pools (category + any_of/none_of tag sets,
+                       from the wardrobe or the occasion-filtered items), the
+                       pool combinations that make an outfit (shapes), and
+                       whether an empty result falls through to the next one
+    dispatch           ordered rules mapping occasions to strategies
+
+load() validates the file and compiles it once: tag sets become frozensets
+(which CandidatePlanner turns into cached bitmasks per index), every party
+variant/waiver combination is resolved into its pools up front, and routes
+are memoised per occasion list. Answering a request is then a route lookup
+plus bitmask tests; adding an occasion or a tag is an edit to the JSON file.
+
+    rules = load()
+    for strategy in rules.route(["wedding"]):
+        pools = strategy.select(planner, ["wedding"], filtered)
+        pools["tops"]        # items, in wardrobe order
+        pools.bits("tops")   # the same as a bitset
+"""
+
+import argparse
+import json
+import os
+import sys
+from itertools import combinations
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "occasion_rules.json")
+RULES_VERSION = 1
+
+CATEGORIES = ("topwear", "bottomwear", "one_piece", "layer")
+SOURCES = ("wardrobe", "filtered")
+# Outfit builders SmartOutfitRecommender implements (as _build_<name>) and the pools each one reads;
+# a strategy must define every pool its builder reads. Keep in step with the _build_* methods in PRO.PY.
+BUILDERS: Dict[str, FrozenSet[str]] = {
+    "office_ethnic": frozenset({"tops", "bottoms", "formal_tops", "formal_bottoms"}),
+    "funeral": frozenset({"tops", "bottoms", "formal_tops", "formal_bottoms", "formal_layers"}),
+    "formal": frozenset({"tops", "bottoms", "layers"}),
+    "party": frozenset({"one_pieces", "tops", "bottoms", "layers", "blazers"}),
+    "ritual": frozenset({"tops", "bottoms", "layers", "one_pieces"}),
+    "casual": frozenset({"tops", "bottoms", "layers"}),
+    "swimming": frozenset({"tops", "bottoms", "layers", "one_pieces"}),
+    "sporty": frozenset({"tops", "bottoms", "layers"}),
+}
+
+_ROUTE_CACHE_LIMIT = 4096
+
+
+class Pool:
+    """One candidate pool: category items with any of any_of and none of none_of"""
+
+    __slots__ = ("name", "category", "any_of", "none_of", "expand_from", "expand_categories")
+
+    def __init__(self, name: str, category: str, any_of: FrozenSet[str], none_of: FrozenSet[str],
+                 expand_from: Optional[FrozenSet[str]] = None, expand_categories: Tuple[str, ...] = ()):
+        self.name = name
+        self.category = category
+        self.any_of = any_of
+        self.none_of = none_of
+        # any_of also takes every tag carried by the candidate items that have one of expand_from
+        self.expand_from = expand_from
+        self.expand_categories = expand_categories
+
+
+class PoolSelection:
+    """Candidate pools of one strategy run; each is computed on first access"""
+
+    def __init__(self, strategy: "Strategy", pools: Dict[str, Pool], planner, filtered: Optional[int]):
+        self.strategy = strategy
+        self._pools = pools
+        self._planner = planner
+        self._within = filtered if strategy.source == "filtered" else None
+        self._bits: Dict[str, int] = {}
+        self._items: Dict[str, List[Dict]] = {}
+        self._expanded: Dict[Tuple, set] = {}
+
+    def _any_of(self, pool: Pool):
+        if pool.expand_from is None:
+            return pool.any_of
+        key = (pool.expand_from, pool.expand_categories)
+        tags = self._expanded.get(key)
+        if tags is None:
+            index = self._planner.index
+            seed = index.any_tag(pool.expand_from)
+            if self._within is not None:
+                seed &= self._within
+            categories = 0
+            for category in pool.expand_categories:
+                categories |= index.category(category)
+            tags = self._expanded[key] = index.tags_of(seed & categories)
+        # A plain set: these depend on the request, so the planner should not cache their masks
+        return tags | pool.any_of
+
+    def bits(self, name: str) -> int:
+        bits = self._bits.get(name)
+        if bits is None:
+            pool = self._pools[name]
+            bits = self._bits[name] = self._planner.bits(pool.category, self._any_of(pool), pool.none_of, self._within)
+        return bits
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._pools
+
+    def __getitem__(self, name: str) -> List[Dict]:
+        items = self._items.get(name)
+        if items is None:
+            bits = self.bits(name)
+            items = self._items[name] = self._planner.index.select(bits) if bits else []
+        return items
+
+    def can_fill(self) -> bool:
+        """Whether every pool of at least one shape is non-empty"""
+        return any(all(self.bits(name) for name in shape) for shape in self.strategy.shapes)
+
+
+class Strategy:
+    """A compiled strategy entry: builder, pools per occasion variant, shapes"""
+
+    def __init__(self, name: str, builder: str, source: str, fallthrough: bool, shapes: Tuple[Tuple[str, ...], ...],
+                 variants: List[FrozenSet[str]], waivers: List[Tuple[str, FrozenSet[str]]],
+                 resolved: Dict[Tuple[int, FrozenSet[str]], Dict[str, Pool]]):
+        self.name = name
+        self.builder = builder
+        self.source = source
+        self.fallthrough = fallthrough
+        self.shapes = shapes
+        # "sporty:hiking" -> "hiking"
+        self.activity = name.split(":", 1)[-1]
+        self._variants = variants
+        self._waivers = waivers
+        self._resolved = resolved
+
+    def __repr__(self):
+        return f"Strategy({self.name!r})"
+
+    def pools(self, occasions) -> Dict[str, Pool]:
+        """The pools for these occasions (first matching variant, waived exclusions dropped)"""
+        if not self._variants and not self._waivers:
+            return self._resolved[(0, frozenset())]
+        occ = [str(o).lower() for o in occasions]
+        variant = 0
+        for i, if_any in enumerate(self._variants, 1):
+            if not if_any.isdisjoint(occ):
+                variant = i
+                break
+        waived = frozenset(name for name, unless in self._waivers if not unless.isdisjoint(occ))
+        return self._resolved[(variant, waived)]
+
+    def select(self, planner, occasions, filtered: Optional[int] = None) -> PoolSelection:
+        """Candidate pools for a run; filtered is the occasion/requirement filtered bitset"""
+        if self.source == "filtered" and filtered is None:
+            raise ValueError(f"strategy {self.name!r} selects from the filtered items; pass filtered")
+        return PoolSelection(self, self.pools(occasions), planner, filtered)
+
+
+class OccasionRules:
+    """Compiled occasion_rules.json"""
+
+    def __init__(self, data: Dict, path: str = RULES_PATH):
+        validate(data, path)
+        self.path = path
+        self.version = data["version"]
+        self.tag_sets: Dict[str, FrozenSet[str]] = {name: frozenset(tags) for name, tags in data["tag_sets"].items()}
+        keywords = data["occasion_keywords"]
+        self.activity_keywords: Dict[str, List[str]] = keywords["activity"]
+        self.other_keywords: Dict[str, List[str]] = keywords["other"]
+        # Checked in this order; the first one in the prompt is the occasion reported with "office"
+        self.office_ethnic_keywords: List[str] = keywords["office_ethnic"]
+        items = data["occasion_items"]
+        self.occasion_sporty: Dict[str, FrozenSet[str]] = {occ: frozenset(tags) for occ, tags in items["sporty"].items()}
+        self.party_occasions = frozenset(items["party_occasions"])
+        self.party_tags = self.tag_sets[items["party_tags"]]
+        self.strategies: Dict[str, Strategy] = {
+            name: self._compile_strategy(name, spec) for name, spec in data["strategies"].items()
+        }
+        self.dispatch: List[Tuple[Strategy, FrozenSet[str], Tuple[str, ...]]] = [
+            (self.strategies[rule["strategy"]], frozenset(rule["if_any"]), tuple(rule.get("and_mentions", ())))
+            for rule in data["dispatch"]
+        ]
+        self._routes: Dict[Tuple[str, ...], List[Strategy]] = {}
+
+    def _compile_strategy(self, name: str, spec: Dict) -> Strategy:
+        tag_sets = self.tag_sets
+        variant_specs = spec.get("variants", [])
+        waiver_names = list(spec.get("waivers", {}))
+
+        def compile_pools(renames: Dict[str, str], waived: FrozenSet[str]) -> Dict[str, Pool]:
+            pools = {}
+            for pool_name, pool in spec["pools"].items():
+                none_of = frozenset().union(*(tag_sets[renames.get(n, n)] for n in pool.get("none_of", ())
+                                              if n not in waived))
+                expand = pool.get("expand_from")
+                pools[pool_name] = Pool(
+                    pool_name, pool["category"], tag_sets[renames.get(pool["any_of"], pool["any_of"])], none_of,
+                    tag_sets[expand["any_of"]] if expand else None,
+                    tuple(expand["categories"]) if expand else (),
+                )
+            return pools
+
+        # Every (variant, waived exclusions) combination, so a request only looks its pools up
+        resolved = {}
+        renames_by_variant = [{}] + [variant["tag_sets"] for variant in variant_specs]
+        for variant, renames in enumerate(renames_by_variant):
+            for size in range(len(waiver_names) + 1):
+                for waived in combinations(waiver_names, size):
+                    resolved[(variant, frozenset(waived))] = compile_pools(renames, frozenset(waived))
+        variants = [frozenset(v["if_any"]) for v in variant_specs]
+        waivers = [(n, frozenset(spec["waivers"][n])) for n in waiver_names]
+        return Strategy(name, spec["builder"], spec.get("source", "wardrobe"), spec.get("fallthrough", False),
+                        tuple(tuple(shape) for shape in spec["shapes"]), variants, waivers, resolved)
+
+    def route(self, occasions) -> List[Strategy]:
+        """Strategies to try for these occasions, in order; all but the last fall through when empty"""
+        occ = tuple(str(o).lower() for o in occasions)
+        steps = self._routes.get(occ)
+        if steps is not None:
+            return steps
+        joined = " ".join(occ)
+        steps = []
+        for strategy, if_any, mentions in self.dispatch:
+            if if_any.isdisjoint(occ):
+                continue
+            if mentions and not any(kw in joined for kw in mentions):
+                continue
+            steps.append(strategy)
+            if not strategy.fallthrough:
+                break
+        if len(self._routes) >= _ROUTE_CACHE_LIMIT:
+            self._routes.clear()
+        self._routes[occ] = steps
+        return steps
+
+    def occasion_bits(self, index, occasions) -> int:
+        """Bitset of filter_items_by_occasion(occasions) on a TagIndex"""
+        if isinstance(occasions, str):
+            occasions = [occasions]
+        bits = index.any_tag(occasions)
+        for occ in occasions:
+            if occ in self.occasion_sporty:
+                bits |= index.any_tag(self.occasion_sporty[occ])
+            if occ in self.party_occasions:
+                bits |= index.any_tag(self.party_tags)
+        return bits
+
+
+# --- validation ---
+def _fail(path: str, message: str):
+    raise ValueError(f"{path}: {message}")
+
+
+def _check_word_list(path: str, where: str, value) -> None:
+    if not isinstance(value, list) or not value or not all(isinstance(v, str) and v for v in value):
+        _fail(path, f"{where} must be a non-empty list of strings")
+
+
+def _check_object(path: str, where: str, value) -> None:
+    if not isinstance(value, dict):
+        _fail(path, f"{where} must be an object")
+
+
+def validate(data: Dict, path: str = RULES_PATH) -> None:
+    """Raise ValueError naming the first problem in a rules document"""
+    if not isinstance(data, dict):
+        _fail(path, "expected a JSON object")
+    if data.get("version") != RULES_VERSION:
+        _fail(path, f"unsupported rules version {data.get('version')!r} (expected {RULES_VERSION})")
+    for key in ("tag_sets", "occasion_keywords", "occasion_items", "strategies", "dispatch"):
+        if key not in data:
+            _fail(path, f"missing {key!r}")
+
+    tag_sets = data["tag_sets"]
+    _check_object(path, "tag_sets", tag_sets)
+    for name, tags in tag_sets.items():
+        _check_word_list(path, f"tag_sets.{name}", tags)
+
+    def check_tag_set(where: str, name) -> None:
+        if not isinstance(name, str) or name not in tag_sets:
+            _fail(path, f"{where}: unknown tag set {name!r}")
+
+    keywords = data["occasion_keywords"]
+    _check_object(path, "occasion_keywords", keywords)
+    for group in ("activity", "other"):
+        _check_object(path, f"occasion_keywords.{group}", keywords.get(group))
+        for occ, words in keywords[group].items():
+            _check_word_list(path, f"occasion_keywords.{group}.{occ}", words)
+    _check_word_list(path, "occasion_keywords.office_ethnic", keywords.get("office_ethnic"))
+
+    items = data["occasion_items"]
+    _check_object(path, "occasion_items", items)
+    _check_object(path, "occasion_items.sporty", items.get("sporty"))
+    for occ, tags in items["sporty"].items():
+        _check_word_list(path, f"occasion_items.sporty.{occ}", tags)
+    _check_word_list(path, "occasion_items.party_occasions", items.get("party_occasions"))
+    check_tag_set("occasion_items.party_tags", items.get("party_tags"))
+
+    strategies = data["strategies"]
+    if not isinstance(strategies, dict) or not strategies:
+        _fail(path, "strategies must be a non-empty object")
+    for name, spec in strategies.items():
+        where = f"strategies.{name}"
+        _check_object(path, where, spec)
+        if not isinstance(spec.get("builder"), str) or spec["builder"] not in BUILDERS:
+            _fail(path, f"{where}: builder must be one of {', '.join(BUILDERS)}")
+        if spec.get("source", "wardrobe") not in SOURCES:
+            _fail(path, f"{where}: source must be one of {', '.join(SOURCES)}")
+        if not isinstance(spec.get("fallthrough", False), bool):
+            _fail(path, f"{where}: fallthrough must be true or false")
+        pools = spec.get("pools")
+        if not isinstance(pools, dict) or not pools:
+            _fail(path, f"{where}: pools must be a non-empty object")
+        missing = BUILDERS[spec["builder"]] - set(pools)
+        if missing:
+            _fail(path, f"{where}: builder {spec['builder']!r} needs pools {', '.join(sorted(missing))}")
+        excluded = set()
+        for pool_name, pool in pools.items():
+            pool_where = f"{where}.pools.{pool_name}"
+            _check_object(path, pool_where, pool)
+            if pool.get("category") not in CATEGORIES:
+                _fail(path, f"{pool_where}: category must be one of {', '.join(CATEGORIES)}")
+            check_tag_set(pool_where, pool.get("any_of"))
+            if not isinstance(pool.get("none_of", []), list):
+                _fail(path, f"{pool_where}: none_of must be a list of tag sets")
+            for excluded_name in pool.get("none_of", []):
+                check_tag_set(pool_where, excluded_name)
+                excluded.add(excluded_name)
+            expand = pool.get("expand_from")
+            if expand is not None:
+                _check_object(path, f"{pool_where}.expand_from", expand)
+                check_tag_set(f"{pool_where}.expand_from", expand.get("any_of"))
+                if not isinstance(expand.get("categories"), list) or not expand["categories"] \
+                        or not all(category in CATEGORIES for category in expand["categories"]):
+                    _fail(path, f"{pool_where}.expand_from: categories must be a non-empty list of categories")
+        shapes = spec.get("shapes")
+        if not isinstance(shapes, list) or not shapes:
+            _fail(path, f"{where}: shapes must be a non-empty list")
+        for shape in shapes:
+            if not isinstance(shape, list) or not shape or not all(isinstance(p, str) and p in pools for p in shape):
+                _fail(path, f"{where}: shape {shape!r} must list pools of this strategy")
+        if not isinstance(spec.get("variants", []), list):
+            _fail(path, f"{where}: variants must be a list")
+        for variant in spec.get("variants", []):
+            _check_object(path, f"{where}.variants[]", variant)
+            _check_word_list(path, f"{where}.variants.if_any", variant.get("if_any"))
+            _check_object(path, f"{where}.variants.tag_sets", variant.get("tag_sets"))
+            for original, replacement in variant["tag_sets"].items():
+                check_tag_set(f"{where}.variants", original)
+                check_tag_set(f"{where}.variants", replacement)
+        _check_object(path, f"{where}.waivers", spec.get("waivers", {}))
+        for waived, unless in spec.get("waivers", {}).items():
+            if waived not in excluded:
+                _fail(path, f"{where}.waivers: {waived!r} is not excluded by any pool")
+            _check_word_list(path, f"{where}.waivers.{waived}", unless)
+
+    dispatch = data["dispatch"]
+    if not isinstance(dispatch, list) or not dispatch:
+        _fail(path, "dispatch must be a non-empty list")
+    dispatched = set()
+    for i, rule in enumerate(dispatch):
+        _check_object(path, f"dispatch[{i}]", rule)
+        if not isinstance(rule.get("strategy"), str) or rule["strategy"] not in strategies:
+            _fail(path, f"dispatch[{i}]: unknown strategy {rule.get('strategy')!r}")
+        _check_word_list(path, f"dispatch[{i}].if_any", rule.get("if_any"))
+        if "and_mentions" in rule:
+            _check_word_list(path, f"dispatch[{i}].and_mentions", rule["and_mentions"])
+        dispatched.add(rule["strategy"])
+    for name in strategies:
+        if name not in dispatched:
+            _fail(path, f"strategies.{name}: never dispatched")
+
+
+def load(path: str = RULES_PATH) -> OccasionRules:
+    """Read, validate and compile a rules file"""
+    with open(path, encoding="utf-8") as f:
+        try:
+            data = json.load(f)
+        except ValueError as e:
+            raise ValueError(f"{path}: invalid JSON ({e})") from None
+    return OccasionRules(data, path)
+
+
+# Compiled once at import; the engine and the coverage/cardinality helpers share it
+RULES = load()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate an occasion rules file and show its routes")
+    parser.add_argument("path", nargs="?", default=RULES_PATH)
+    parser.add_argument("--route", action="append", default=[], metavar="OCCASION",
+                        help="print the strategies tried for these occasions (repeatable)")
+    args = parser.parse_args(argv)
+    try:
+        rules = load(args.path)
+    except ValueError as e:
+        print(e)
+        return 1
+    print(f"{args.path}: ok ({len(rules.tag_sets)} tag sets, {len(rules.strategies)} strategies, "
+          f"{len(rules.dispatch)} dispatch rules)")
+    if args.route:
+        print(" -> ".join(s.name for s in rules.route(args.route)) or "unmatched")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""HTML rendering for outfit recommendations.
+
+The page template is compiled once at import time; each request only fills
+in the per-item fragments and streams the result as UTF-8 chunks, so nothing
+has to touch the disk unless the caller asks for a file.
+"""
+
+import io
+import os
+import tempfile
+import uuid
+from html import escape
+from string import Template
+from typing import Dict, Iterator, List, Optional
+
+import image_manifest
+import thumbnails
+
+PAGE_HEAD = "\n".join([
+    "<!DOCTYPE html>",
+    "<html><head>",
+    "<title>Outfit Recommendations</title>",
+    "<style>",
+    "body { font-family: Arial, sans-serif; padding: 20px; }",
+    ".outfit { border: 1px solid #ddd; padding: 15px; margin-bottom: 20px; }",
+    ".outfit-details { margin-bottom: 10px; }",
+    ".side-info { margin-bottom: 10px; }",
+    ".vertical-stack { display: flex; flex-direction: row; gap: 20px; }",
+    ".item { text-align: center; }",
+    ".item .no-image { width: 120px; height: 120px; line-height: 120px; border: 1px dashed #ccc; color: #999; margin-bottom: 5px; }",
+    ".item img { width: 120px; height: 120px; object-fit: contain; border: 1px solid #ccc; margin-bottom: 5px; }",
+    "</style>",
+    "</head><body>",
+    "<h1>Outfit Recommendations</h1>",
+]) + "\n"
+PAGE_TAIL = "</body></html>"
+
+OUTFIT_OPEN = Template('<div class="outfit">\n<div class="outfit-details">\n<h2>Outfit $index</h2>\n<div class="side-info">\n')
+ITEM_INFO = Template('<div><b>$name</b> ($category)<br>ID: $id<br>Tags: $tags</div>\n')
+OUTFIT_MIDDLE = '</div></div>\n<div class="vertical-stack">\n'
+ITEM_IMAGE = Template('<div class="item"><img src="$src" alt="$name" width="120" height="120" loading="lazy"><br>$name</div>\n')
+ITEM_THUMB = Template(
+    '<div class="item"><img src="$src" srcset="$srcset" sizes="120px" alt="$name" '
+    'width="120" height="120" loading="lazy"><br>$name</div>\n'
+)
+ITEM_NO_IMAGE = Template('<div class="item"><div class="no-image">No image</div>$name</div>\n')
+OUTFIT_CLOSE = '</div></div></div>\n'
+
+
+class OutfitPageRenderer:
+    """Render outfits into the recommendations page, chunk by chunk."""
+
+    def __init__(self, static_prefix: str = "static/", thumb_prefix: str = "static/thumbs/",
+                 thumbnail_index: Optional[Dict[str, Dict]] = None,
+                 manifest: Optional[Dict[str, Dict]] = None):
+        self.static_prefix = static_prefix
+        self.thumb_prefix = thumb_prefix
+        self._versions: Optional[Dict[str, str]] = None
+        self.use_manifest(manifest)
+        # image filename -> {width: thumbnail filename}, resolved once up front
+        self._thumbs = {
+            image: sorted((int(w), name) for w, name in entry.get("variants", {}).items())
+            for image, entry in (thumbnail_index or {}).items()
+            if entry.get("variants")
+        }
+        self._head = PAGE_HEAD.encode("utf-8")
+        self._tail = PAGE_TAIL.encode("utf-8")
+
+    def use_manifest(self, manifest: Optional[Dict[str, Dict]]) -> None:
+        """Switch to a (re)loaded image manifest; an empty one disables the checks"""
+        # image filename -> short content hash used as the ?v= cache buster
+        self._versions = {image: entry["sha256"][:12] for image, entry in manifest.items()} if manifest else None
+
+    def image_tag(self, item: Dict) -> str:
+        """Build the <div class="item"> block showing an item's image, via thumbnails when built"""
+        image = item.get("image", "")
+        suffix = ""
+        if self._versions is not None:
+            version = self._versions.get(image)
+            if version is None:
+                return ITEM_NO_IMAGE.substitute(name=escape(item["name"]))
+            suffix = "?v=" + version
+        variants = self._thumbs.get(image)
+        if variants:
+            return ITEM_THUMB.substitute(
+                src=escape(self.thumb_prefix + variants[0][1] + suffix),
+                srcset=escape(", ".join(f"{self.thumb_prefix}{name}{suffix} {w}w" for w, name in variants)),
+                name=escape(item["name"]),
+            )
+        return ITEM_IMAGE.substitute(
+            src=escape(self.static_prefix + image + suffix),
+            name=escape(item["name"]),
+        )
+
+    def _render_outfit(self, index: int, outfit: Dict) -> str:
+        parts = [OUTFIT_OPEN.substitute(index=index)]
+        for item in outfit["items"]:
+            parts.append(ITEM_INFO.substitute(
+                name=escape(item["name"]),
+                category=escape(item["category"]),
+                id=escape(str(item["id"])),
+                tags=escape(", ".join(item.get("tags", []))),
+            ))
+        parts.append(OUTFIT_MIDDLE)
+        for item in outfit["items"]:
+            parts.append(self.image_tag(item))
+        parts.append(OUTFIT_CLOSE)
+        return "".join(parts)
+
+    def iter_chunks(self, outfits: List[Dict]) -> Iterator[bytes]:
+        """Yield the page as UTF-8 encoded chunks (head, one per outfit, tail)"""
+        yield self._head
+        for idx, outfit in enumerate(outfits, 1):
+            yield self._render_outfit(idx, outfit).encode("utf-8")
+        yield self._tail
+
+    def render(self, outfits: List[Dict]) -> bytes:
+        """Render the whole page into memory"""
+        return b"".join(self.iter_chunks(outfits))
+
+    def stream(self, outfits: List[Dict], out) -> None:
+        """Write the page to any binary or text writable (file, socket file, BytesIO, ...)"""
+        if isinstance(out, io.TextIOBase):
+            for chunk in self.iter_chunks(outfits):
+                out.write(chunk.decode("utf-8"))
+        else:
+            for chunk in self.iter_chunks(outfits):
+                out.write(chunk)
+
+    def write_file(self, outfits: List[Dict], filename: Optional[str] = None,
+                   directory: str = ".", prefix: str = "outfits-") -> str:
+        """Write the page to disk and return its absolute path.
+
+        Without an explicit filename every call gets its own uniquely named
+        file, so concurrent requests never overwrite each other's page. The
+        page is written to a temporary file first and moved into place.
+        """
+        if filename is None:
+            filename = os.path.join(directory, f"{prefix}{uuid.uuid4().hex}.html")
+        target_dir = os.path.dirname(os.path.abspath(filename))
+        fd, tmp_path = tempfile.mkstemp(dir=target_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                self.stream(outfits, f)
+            os.replace(tmp_path, filename)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return os.path.abspath(filename)
+
+
+default_renderer = OutfitPageRenderer(thumbnail_index=thumbnails.load_index(),
+                                      manifest=image_manifest.load_manifest())
@@ -4,10 +4,8 @@ import datetime
 import random
 import re
 import os
-import webbrowser
 from typing import List, Dict, Tuple, Set, Optional
 from collections import defaultdict
-from IPython.display import HTML
 
 class SmartOutfitRecommender:
     def __init__(self, wardrobe_db: List[Dict] = None):
@@ -1423,4 +1421,5 @@ if __name__ == "__main__":
         # Generate and open HTML with images
         html_path = recommender.generate_outfit_html(result["outfits"], filename="outfits.html")
         print(f"\nVisualize these outfits: file://{html_path}")
+        import webbrowser  # only needed once a page is opened
         webbrowser.open(f'file://{html_path}')
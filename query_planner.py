@@ -0,0 +1,96 @@
+"""Selectivity-ordered candidate selection over the tag index.
+
+A candidate pool in _strategy_outfits is a conjunction: one category, at
+least one of some tags, optionally inside an already filtered set, and none
+of some exclusion tags. CandidatePlanner estimates each conjunct from the
+cardinality catalog, intersects the smallest first and stops as soon as the
+running intersection is empty, so a pool like "funeral tops" costs the
+handful of funeral items rather than a pass over the wardrobe. Exclusions
+are applied last, to whatever survived. Results come back in wardrobe order.
+
+Tag sets passed as frozensets (the compiled sets from occasion_rules) are
+treated as fixed predicates: their any-of bitmask is computed once per index
+and reused, so steady-state pool selection is a few big-int ANDs.
+
+    planner = CandidatePlanner(index, catalog)
+    planner.select("topwear", {"funeral"})
+    planner.select("bottomwear", formal_tags, none_of=exclude_tags, within=filtered_bits)
+"""
+
+import sys
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from cardinality import CardinalityCatalog
+from tag_index import TagIndex
+
+
+class CandidatePlanner:
+    """Plans and runs category/tag selections on a TagIndex"""
+
+    def __init__(self, index: TagIndex, catalog: Optional[CardinalityCatalog] = None):
+        self.index = index
+        self.catalog = catalog
+        self._masks: Dict[frozenset, int] = {}
+
+    def mask(self, tags: Iterable[str]) -> int:
+        """Items carrying any of tags; frozensets are cached, anything else is computed each time"""
+        if isinstance(tags, frozenset):
+            bits = self._masks.get(tags)
+            if bits is None:
+                bits = self._masks[tags] = self.index.any_tag(tags)
+            return bits
+        return self.index.any_tag(tags)
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the cached masks"""
+        return sys.getsizeof(self._masks) + sum(sys.getsizeof(bits) for bits in self._masks.values())
+
+    def update(self, pos: int, old_tags: Iterable[str] = (), new_tags: Iterable[str] = ()) -> None:
+        """Keep the cached masks in step with the item at pos changing tags (no old_tags: added, no new_tags: removed)"""
+        bit = 1 << pos
+        old_tags, new_tags = set(old_tags), set(new_tags)
+        masks = self._masks
+        for tags, bits in masks.items():
+            had = not tags.isdisjoint(old_tags)
+            has = not tags.isdisjoint(new_tags)
+            if had != has:
+                masks[tags] = bits | bit if has else bits & ~bit
+
+    def plan(self, category: str, any_of: Optional[Iterable[str]] = None,
+             within: Optional[int] = None) -> List[Tuple[int, str, Callable[[], int]]]:
+        """Conjuncts as (estimated size, name, bitset thunk), smallest estimate first"""
+        index, catalog = self.index, self.catalog
+        steps = []
+        if catalog is not None:
+            steps.append((catalog.categories.get(category, 0), "category", lambda: index.category(category)))
+        else:
+            steps.append((len(index.items), "category", lambda: index.category(category)))
+        if any_of is not None:
+            tags = any_of if isinstance(any_of, (set, frozenset, list, tuple)) else list(any_of)
+            estimate = catalog.any_count(category, tags) if catalog is not None else len(index.items)
+            steps.append((estimate, "any_of", lambda: self.mask(tags)))
+        if within is not None:
+            # Already materialised, so it is free to intersect; a zero-size estimate only when empty
+            steps.append((0 if not within else 1, "within", lambda: within))
+        steps.sort(key=lambda step: step[0])
+        return steps
+
+    def bits(self, category: str, any_of: Optional[Iterable[str]] = None, none_of: Iterable[str] = (),
+             within: Optional[int] = None) -> int:
+        """Bitset of items in category, with any of any_of, none of none_of, inside within"""
+        result = None
+        for estimate, _, thunk in self.plan(category, any_of, within):
+            if estimate == 0:
+                return 0
+            result = thunk() if result is None else result & thunk()
+            if not result:
+                return 0
+        if none_of:
+            result &= ~self.mask(none_of)
+        return result
+
+    def select(self, category: str, any_of: Optional[Iterable[str]] = None, none_of: Iterable[str] = (),
+               within: Optional[int] = None) -> List[Dict]:
+        """Items for bits(...), in wardrobe order"""
+        bits = self.bits(category, any_of, none_of, within)
+        return self.index.select(bits) if bits else []
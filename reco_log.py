@@ -0,0 +1,198 @@
+"""Asynchronous JSONL log of every recommendation.
+
+Assign a RecommendationLogger to recommender.request_log and each
+recommend_outfits call enqueues one record (prompt, parsed intent, strategy
+branch, returned item ids, timings). The request path only does a
+non-blocking put on a bounded queue; when the queue is full the record is
+dropped and counted instead of slowing the request down. A background
+thread drains the queue in batches and appends them to JSONL files under
+`directory`, starting a new file when the current one passes max_bytes, so
+the log directory doubles as a set of shards for log_analytics.py. With
+max_files set, opening a new file deletes the oldest of the directory's log
+files (those named prefix-*.jsonl, oldest by modification time) until at
+most max_files are left, the new one included, so the directory holds about
+max_files x max_bytes; by default nothing is deleted. Records
+logged after close() are counted as dropped; a record that can't be
+serialized is counted as unserializable and skipped.
+
+    log = RecommendationLogger("logs")
+    recommender.request_log = log
+    ...
+    log.close()          # flush what is queued and stop the writer
+"""
+
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+_STOP = object()
+
+
+def recommendation_record(prompt: str, occasions, required, preferred, forbidden, strategy: Optional[str],
+                          used_fallback: bool, outfits: List[Dict], context: Dict, timings: Dict) -> Dict:
+    """The JSON record logged for one recommend_outfits call"""
+    return {
+        "ts": round(time.time(), 3),
+        "prompt": prompt,
+        "occasions": list(occasions),
+        "required": list(required),
+        "preferred": list(preferred),
+        "forbidden": list(forbidden),
+        "strategy": strategy,
+        "fallback": used_fallback,
+        "context": context,
+        "outfits": [
+            {"type": outfit.get("type", ""), "ids": [item["id"] for item in outfit["items"]]}
+            for outfit in outfits
+        ],
+        "timings_ms": timings,
+    }
+
+
+class RecommendationLogger:
+    """Bounded queue plus a writer thread that batches records into rotating JSONL files"""
+
+    def __init__(self, directory: str = "logs", prefix: str = "recommendations",
+                 max_bytes: int = DEFAULT_MAX_BYTES, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 batch_size: int = DEFAULT_BATCH_SIZE, max_files: Optional[int] = None):
+        if max_files is not None and max_files < 1:
+            raise ValueError(f"max_files must be at least 1, got {max_files}")
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.batch_size = batch_size
+        self.dropped = 0
+        self.written = 0
+        self.write_errors = 0
+        self.unserializable = 0
+        self.pruned = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._sequence = itertools.count(1)
+        self._file = None
+        self._file_bytes = 0
+        self.current_path: Optional[str] = None
+        os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="reco-log-writer", daemon=True)
+        self._thread.start()
+
+    def log(self, record: Dict) -> bool:
+        """Enqueue a record without blocking; returns False (and counts a drop) if the queue is full or closed"""
+        with self._lock:
+            if not self._closed:
+                try:
+                    self._queue.put_nowait(record)
+                    return True
+                except queue.Full:
+                    pass
+            self.dropped += 1
+            return False
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "write_errors": self.write_errors,
+            "unserializable": self.unserializable,
+            "pruned": self.pruned,
+        }
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Write everything already queued, then stop the writer thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- writer thread ---
+    def _open_next(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime())
+        name = f"{self.prefix}-{stamp}-{os.getpid()}-{next(self._sequence):04d}.jsonl"
+        self.current_path = os.path.join(self.directory, name)
+        self._file = open(self.current_path, "ab")
+        self._file_bytes = 0
+        if self.max_files is not None:
+            self._prune()
+
+    def _prune(self) -> None:
+        """Delete the oldest log files until at most max_files are left (never the current one)"""
+        files = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.startswith(self.prefix + "-") and name.endswith(".jsonl") and path != self.current_path:
+                try:
+                    files.append((os.path.getmtime(path), name, path))
+                except OSError:
+                    continue  # removed meanwhile (e.g. by another process's logger)
+        files.sort()
+        for _, _, path in files[:max(0, len(files) - (self.max_files - 1))]:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.pruned += 1
+
+    def _write(self, batch: List[Dict]) -> None:
+        lines = []
+        for record in batch:
+            try:
+                lines.append(json.dumps(record, ensure_ascii=False) + "\n")
+            except Exception:
+                # A bad record (a set, a circular reference, ...) must not stop the writer thread
+                self.unserializable += 1
+        if not lines:
+            return
+        data = "".join(lines).encode("utf-8")
+        try:
+            if self._file is None or self._file_bytes >= self.max_bytes:
+                self._open_next()
+            self._file.write(data)
+            self._file.flush()
+        except OSError:
+            self.write_errors += len(lines)
+            return
+        self._file_bytes += len(data)
+        self.written += len(lines)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            # Block for the first record, then take whatever else is already queued
+            item = self._queue.get()
+            batch = []
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,192 @@
+"""Replay recorded prompt logs against SmartOutfitRecommender.
+
+Reads a JSONL log line by line (constant memory, any size), pulls the prompt
+out of each record and replays it with a pool of worker threads, either as
+fast as possible or paced to a target request rate. Each worker thread owns
+its own recommender, since the engine keeps per-instance "recently used"
+state. Reports latency percentiles, throughput, error counts and how far the
+replay fell behind the requested schedule.
+
+Usage:
+    python replay_prompts.py prompts.jsonl [--field prompt] [--rate 50] [--concurrency 8] [--limit 10000]
+    python synth_wardrobe.py prompts --count 1000 | python replay_prompts.py -
+    python replay_prompts.py prompts.jsonl --wardrobe items.jsonl --watch 2   # reload items.jsonl on change
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, Optional, TextIO, Tuple
+
+from engine_loader import load_engine
+from stage_timing import Histogram
+
+
+def iter_prompts(stream: TextIO, field: str = "prompt") -> Iterator[Tuple[int, Optional[str], Optional[str]]]:
+    """Yield (line number, prompt, None) per prompt, or (line number, None, error) for a line without one.
+
+    JSONL records give their `field`; plain-text lines are taken as prompts as they are.
+    """
+    for line_no, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        if not line.startswith("{"):
+            yield line_no, line, None
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, f"invalid JSON ({e})"
+            continue
+        prompt = record.get(field) if isinstance(record, dict) else None
+        if isinstance(prompt, str) and prompt.strip():
+            yield line_no, prompt, None
+        else:
+            yield line_no, None, f"no {field!r} string in record"
+
+
+class Replayer:
+    """Drive prompts through recommenders on a thread pool and collect statistics"""
+
+    def __init__(self, concurrency: int = 4, rate: Optional[float] = None, wardrobe=None, request_log=None,
+                 holder=None):
+        self.concurrency = concurrency
+        self.rate = rate
+        self.request_log = request_log
+        # With a hot_reload.EngineHolder, each request runs on whichever snapshot is current when it starts
+        self.holder = holder
+        engine = load_engine()
+        self._factory = lambda: engine.SmartOutfitRecommender(wardrobe if wardrobe is not None else engine.wardrobe_db)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.latency = Histogram()
+        self.errors: Counter = Counter()
+        self.zero_outfits = 0
+        self.bad_lines = 0
+        self.max_lag = 0.0
+
+    def _recommender(self):
+        if self.holder is not None:
+            rec = self.holder.recommender()
+            rec.request_log = self.request_log
+            return rec
+        rec = getattr(self._local, "recommender", None)
+        if rec is None:
+            rec = self._local.recommender = self._factory()
+            rec.request_log = self.request_log
+        return rec
+
+    def _one(self, prompt: str, scheduled: Optional[float]) -> None:
+        start = time.perf_counter()
+        try:
+            result = self._recommender().recommend_outfits(prompt)
+        except Exception as e:
+            with self._lock:
+                self.errors[type(e).__name__] += 1
+            return
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.latency.observe(elapsed)
+            self.zero_outfits += not result["outfits"]
+            if scheduled is not None:
+                self.max_lag = max(self.max_lag, start - scheduled)
+
+    def run(self, prompts: Iterator[Tuple[int, Optional[str], Optional[str]]], limit: Optional[int] = None) -> Dict:
+        """Replay iter_prompts output; lines without a prompt are counted in bad_input_lines"""
+        interval = 1.0 / self.rate if self.rate else 0.0
+        pending = set()
+        sent = 0
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for _, prompt, error in prompts:
+                if limit is not None and sent >= limit:
+                    break
+                if error is not None:
+                    self.bad_lines += 1
+                    continue
+                scheduled = None
+                if interval:
+                    scheduled = wall_start + sent * interval
+                    delay = scheduled - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                # Bound the in-flight work so reading never runs ahead of the pool
+                if len(pending) >= self.concurrency * 2:
+                    _, pending = wait(pending, return_when=FIRST_COMPLETED)
+                pending.add(pool.submit(self._one, prompt, scheduled))
+                sent += 1
+            wait(pending)
+        wall = time.perf_counter() - wall_start
+        return self.report(sent, wall)
+
+    def report(self, sent: int, wall: float) -> Dict:
+        ok = self.latency.count
+        return {
+            "requests": sent,
+            "ok": ok,
+            "errors": sum(self.errors.values()),
+            "errors_by_type": dict(self.errors),
+            "bad_input_lines": self.bad_lines,
+            "zero_outfit_responses": self.zero_outfits,
+            "wall_s": round(wall, 3),
+            "throughput_rps": round(sent / wall, 2) if wall else None,
+            "target_rps": self.rate,
+            "concurrency": self.concurrency,
+            "max_schedule_lag_ms": round(self.max_lag * 1000, 3) if self.rate else None,
+            "latency": self.latency.summary(),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a JSONL prompt log against the recommender")
+    parser.add_argument("log", help="JSONL log file, or '-' for stdin")
+    parser.add_argument("--field", default="prompt", help="record field holding the prompt")
+    parser.add_argument("--rate", type=float, help="target requests per second (default: as fast as possible)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--limit", type=int, help="stop after this many prompts")
+    parser.add_argument("--wardrobe", help="wardrobe file (.json/.jsonl) instead of the bundled wardrobe_db")
+    parser.add_argument("--log-dir", help="also write a recommendation log (reco_log) into this directory")
+    parser.add_argument("--log-max-files", type=int, help="keep at most this many files in --log-dir (oldest deleted)")
+    parser.add_argument("--watch", type=float, metavar="SECONDS",
+                        help="poll --wardrobe at this interval and hot-swap the engine when it changes")
+    args = parser.parse_args(argv)
+    if args.watch and not args.wardrobe:
+        parser.error("--watch needs --wardrobe")
+
+    wardrobe = None
+    watcher = None
+    if args.watch:
+        from hot_reload import WardrobeWatcher
+        watcher = WardrobeWatcher(args.wardrobe, interval=args.watch).start()
+    elif args.wardrobe:
+        from wardrobe_file import load_wardrobe
+        wardrobe = load_wardrobe(args.wardrobe)
+    request_log = None
+    if args.log_dir:
+        from reco_log import RecommendationLogger
+        request_log = RecommendationLogger(args.log_dir, max_files=args.log_max_files)
+    replayer = Replayer(args.concurrency, args.rate, wardrobe, request_log, watcher.holder if watcher else None)
+    stream = sys.stdin if args.log == "-" else open(args.log, encoding="utf-8")
+    try:
+        report = replayer.run(iter_prompts(stream, args.field), args.limit)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        if request_log is not None:
+            request_log.close()
+        if watcher is not None:
+            watcher.stop()
+    if watcher is not None:
+        report["hot_reload"] = watcher.stats()
+    if request_log is not None:
+        report["request_log"] = request_log.stats()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
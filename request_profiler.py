@@ -0,0 +1,104 @@
+"""On-demand profiling of a single recommendation request.
+
+Wrapping one request in profile_request() captures a cProfile run and the
+tracemalloc allocation delta of that request and writes them to a dump
+directory:
+
+    <stem>.prof      cProfile stats (python -m pstats, snakeviz, ...)
+    <stem>.before.tracemalloc / <stem>.after.tracemalloc
+                     tracemalloc snapshots (tracemalloc.Snapshot.load)
+    <stem>.txt       top allocation deltas by line and the hottest functions
+
+Nothing is imported or traced until a request asks for it. cProfile only
+sees the calling thread; tracemalloc is process wide, so allocations made by
+other threads during the request show up in the delta as well. Overlapping
+profiled requests share one tracemalloc session: it is started by the first
+and stopped when the last finishes (never, if something else started it).
+"""
+
+import cProfile
+import itertools
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+DEFAULT_DUMP_DIR = "profiles"
+TOP_ALLOCATIONS = 25
+TOP_FUNCTIONS = 30
+_sequence = itertools.count(1)
+# Profiled requests currently tracing, and whether the first of them started tracemalloc
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_started_tracing = False
+
+
+def _stem(label: str) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "-", label.lower()).strip("-")[:40] or "request"
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime())
+    return f"{stamp}-{os.getpid()}-{next(_sequence)}-{slug}"
+
+
+def _start_tracing() -> None:
+    global _tracing_users, _started_tracing
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            _started_tracing = True
+        _tracing_users += 1
+
+
+def _stop_tracing() -> None:
+    global _tracing_users, _started_tracing
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+
+
+@contextmanager
+def profile_request(label: str, dump_dir: str = DEFAULT_DUMP_DIR) -> Iterator[Dict[str, str]]:
+    """Profile the body of the with-block; yields a dict that is filled with the dump paths"""
+    os.makedirs(dump_dir, exist_ok=True)
+    stem = os.path.join(dump_dir, _stem(label))
+    paths: Dict[str, str] = {}
+    _start_tracing()
+    try:
+        before = tracemalloc.take_snapshot()
+    except BaseException:
+        _stop_tracing()
+        raise
+    profiler = cProfile.Profile()
+    wall_start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield paths
+    finally:
+        profiler.disable()
+        wall = time.perf_counter() - wall_start
+        try:
+            after = tracemalloc.take_snapshot()
+        finally:
+            _stop_tracing()
+
+        paths["cprofile"] = stem + ".prof"
+        profiler.dump_stats(paths["cprofile"])
+        paths["snapshot_before"] = stem + ".before.tracemalloc"
+        paths["snapshot_after"] = stem + ".after.tracemalloc"
+        before.dump(paths["snapshot_before"])
+        after.dump(paths["snapshot_after"])
+
+        paths["summary"] = stem + ".txt"
+        with open(paths["summary"], "w", encoding="utf-8") as f:
+            f.write(f"request: {label}\nwall time: {wall * 1000:.3f} ms\n\n")
+            f.write(f"top {TOP_ALLOCATIONS} allocation deltas:\n")
+            for stat in after.compare_to(before, "lineno")[:TOP_ALLOCATIONS]:
+                f.write(f"  {stat}\n")
+            f.write("\n")
+            stats = pstats.Stats(profiler, stream=f)
+            stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
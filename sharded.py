@@ -0,0 +1,458 @@
+"""Sharded wardrobe search across worker processes.
+
+The wardrobe is partitioned by item id (crc32 of the id, so every process
+agrees) across shard processes. Each shard keeps its items under their
+global wardrobe positions, with its own tag index.
+
+The coordinator parses each prompt once and every shard filters its own
+items for it, in parallel: it works out its candidates (every item that can
+take part in the request) and returns their tag, category and color-name
+postings as bitsets over global positions. Candidates are
+
+- the color-priority items (occasion items matching a requested color)
+- every candidate pool of every strategy the occasions route to, with the
+  color filter and without it (the fallback pass)
+- for pools whose tags are widened from the wardrobe's own items (casual),
+  the pool's categories inside the filtered items, since the widened tags
+  depend on every shard's items
+
+The coordinator ORs the shards' postings into an index of just those
+candidates and runs the ordinary engine on it. It holds no index of the
+whole wardrobe, only the shards' merged tag x category counts (for the
+feasibility checks). Every pool, expansion and color-priority set is the
+same on the candidates as on the whole wardrobe, and in the same order, so
+the outfits are exactly the ones a single SmartOutfitRecommender would pick
+(given the same random state and recent-outfit history, which the
+coordinator carries between requests).
+
+Items travel only when a strategy's builder reads a pool: the builders look
+at every item of a pool they read (by id), so those items are fetched from
+their shards, in one batch per shard, and kept in an LRU cache of
+cache_size items. Nothing else about an item leaves its shard.
+
+A ShardedRecommender is read-only: the shards own the items, so to change
+the wardrobe, update its source and start a new one.
+
+On one machine this is not faster than a single recommender (the engine
+still builds the outfits in one process, and each request is a round trip to
+every shard); what it buys is that filtering and item memory are spread over
+the shard processes.
+
+    with ShardedRecommender("catalog.jsonl", shards=8) as sharded:
+        result = sharded.recommend_outfits("party in red")
+"""
+
+import argparse
+import json
+import sys
+import threading
+import zlib
+from array import array
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional, Sequence, Set, Tuple, Union
+
+import coverage_matrix
+from cardinality import CardinalityCatalog
+from engine_loader import load_engine
+from tag_index import TagIndex, bits_from_positions
+from wardrobe_snapshot import LazyItems
+
+Source = Union[str, Sequence[Dict]]
+# (global wardrobe position, item)
+Candidate = Tuple[int, Dict]
+# A shard's candidates for one request, all over global positions:
+# (candidate bits, tag postings, category postings, name_contains lookups, name_word lookups)
+Postings = Tuple[int, Dict[str, int], Dict[str, int], Dict[str, int], Dict[str, int]]
+DEFAULT_CACHE_SIZE = 100_000
+# What the coordinator may ask a shard process for (Shard methods)
+SHARD_OPS = frozenset({"positions", "catalog", "candidates", "name_contains", "name_word", "lower_names", "take"})
+
+
+def shard_of(item_id, shards: int) -> int:
+    """The shard an item id belongs to (stable across processes, unlike hash())"""
+    return zlib.crc32(str(item_id).encode("utf-8")) % shards
+
+
+def partition(items: Sequence[Dict], shards: int) -> List[List[Candidate]]:
+    """Items split by shard_of their id, each as (global position, item) in wardrobe order"""
+    parts: List[List[Candidate]] = [[] for _ in range(shards)]
+    for pos, item in enumerate(items):
+        parts[shard_of(item.get("id"), shards)].append((pos, item))
+    return parts
+
+
+class Shard:
+    """One partition of the wardrobe, indexed at global positions, answering candidate requests"""
+
+    def __init__(self, candidates: List[Candidate], engine=None):
+        engine = engine or load_engine()
+        self._positions = [pos for pos, _ in candidates]
+        # The engine fills in missing tags/category, as it would for the whole wardrobe
+        self.recommender = engine.SmartOutfitRecommender([item for _, item in candidates])
+        self.items = dict(zip(self._positions, self.recommender.wardrobe_db))
+        self.recommender._tag_index = self.index = self._global_index()
+        self.recommender._cardinality = CardinalityCatalog(self.items.values())
+        self.recommender._mark_indexed()
+
+    def _global_index(self) -> TagIndex:
+        """A TagIndex whose positions are the items' global wardrobe positions (the others' bits stay clear),
+        so every bitset it produces can be ORed with other shards' as it is"""
+        tag_positions: Dict[str, List[int]] = {}
+        category_positions: Dict[str, List[int]] = {}
+        for pos, item in self.items.items():
+            for tag in set(item.get("tags", [])):
+                tag_positions.setdefault(tag, []).append(pos)
+            category_positions.setdefault(item.get("category", "unknown"), []).append(pos)
+        index = TagIndex.from_postings(
+            self.items, {tag: bits_from_positions(p) for tag, p in tag_positions.items()},
+            {category: bits_from_positions(p) for category, p in category_positions.items()}, self._names)
+        index.all = bits_from_positions(self._positions)
+        return index
+
+    def _names(self) -> List[str]:
+        names = [""] * (self._positions[-1] + 1 if self._positions else 0)
+        for pos, item in self.items.items():
+            names[pos] = item.get("name", "").lower()
+        return names
+
+    def positions(self) -> List[int]:
+        return self._positions
+
+    def catalog(self) -> CardinalityCatalog:
+        return self.recommender._cardinality
+
+    def _color_variants(self, required: List[str]) -> Set[str]:
+        recommender = self.recommender
+        color_variants = set()
+        for color in required:
+            if color in recommender.color_variants:
+                color_variants.update(recommender._expand_color_requirements(color))
+        return color_variants
+
+    def candidate_bits(self, occasions: List[str], required: List[str]) -> int:
+        """Bitset (global positions) of every item that can appear in, or shape, the request's outfits"""
+        recommender = self.recommender
+        rules = recommender.rules
+        index = self.index
+        planner = recommender._candidate_planner()
+        bits = 0
+        color_variants = self._color_variants(required)
+        if color_variants:
+            # The color-priority pass works on exactly these items
+            bits |= rules.occasion_bits(index, occasions) & coverage_matrix.color_bits(index, color_variants)
+        routes = rules.route(occasions)
+        # The strategy pass filters by the requested colors; the fallback pass runs with no requirements
+        for filtered in {recommender._filtered_bits(occasions, required), recommender._filtered_bits(occasions, [])}:
+            for strategy in routes:
+                within = filtered if strategy.source == "filtered" else None
+                for pool in strategy.pools(occasions).values():
+                    if pool.expand_from is None:
+                        bits |= planner.bits(pool.category, pool.any_of, pool.none_of, within)
+                        continue
+                    categories = index.category(pool.category)
+                    for category in pool.expand_categories:
+                        categories |= index.category(category)
+                    bits |= categories & within if within is not None else categories
+        return bits
+
+    def candidates(self, occasions: List[str], required: List[str]) -> Postings:
+        """This shard's candidates for a request and their postings (see Postings); no items"""
+        bits = self.candidate_bits(occasions, required)
+        index = self.index
+        words = self._color_variants(required)
+        return (
+            bits,
+            {tag: b & bits for tag, b in index.tags.items() if b & bits},
+            {category: b & bits for category, b in index.categories.items() if b & bits},
+            # Every name lookup the engine makes for the request's colors, so it needn't ask again
+            {word: index.name_contains(word) & bits for word in words},
+            {word: index.name_word(word) & bits for word in words},
+        )
+
+    def name_contains(self, text: str) -> int:
+        return self.index.name_contains(text)
+
+    def name_word(self, word: str) -> int:
+        return self.index.name_word(word)
+
+    def lower_names(self) -> List[Tuple[int, str]]:
+        names = self.index._names()
+        return [(pos, names[pos]) for pos in self._positions]
+
+    def take(self, positions: List[int]) -> List[Dict]:
+        items = self.items
+        return [items[pos] for pos in positions]
+
+
+def _load_partition(path: str, shard: int, shards: int) -> List[Candidate]:
+    """This shard's items of a wardrobe file, streamed (each shard process reads the file itself)"""
+    from wardrobe_file import iter_wardrobe
+    return [(pos, item) for pos, item in enumerate(iter_wardrobe(path)) if shard_of(item.get("id"), shards) == shard]
+
+
+def _serve(conn, part: Union[str, List[Candidate]], shard: int, shards: int) -> None:
+    """Shard process: load this shard's items (part: a wardrobe path, or the items already split off),
+    then answer (op, args) requests (see SHARD_OPS) until None"""
+    try:
+        worker = Shard(_load_partition(part, shard, shards) if isinstance(part, str) else part)
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+        return
+    conn.send(("ready", len(worker.positions())))
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+        op, args = request
+        try:
+            if op not in SHARD_OPS:
+                raise ValueError(f"unknown shard operation {op!r}")
+            conn.send(("ok", getattr(worker, op)(*args)))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+    conn.close()
+
+
+class ShardedItems(LazyItems):
+    """The sharded wardrobe as a list (see LazyItems); take() fetches many positions in one round trip"""
+
+    def take(self, positions: List[int]) -> List[Dict]:
+        if self._list is not None:
+            items = self._list
+            return [items[pos] for pos in positions]
+        return self._source.take(positions)
+
+    def _materialize(self) -> List[Dict]:
+        if self._list is None:
+            self._list = self._source.take(range(self._source.count))
+        return self._list
+
+    def __repr__(self):
+        return f"<ShardedItems {len(self)} items from {self._source.path}>"
+
+
+class ShardedTagIndex(TagIndex):
+    """One request's candidates as a TagIndex, from the shards' postings (see Shard.candidates).
+
+    Name lookups the shards did not send with the postings are run by the shards.
+    """
+
+    def _ask_shards(self, op: str, text: str) -> int:
+        bits = 0
+        for part in self.shards.broadcast(op, text):
+            bits |= part
+        return bits & self.all
+
+    def name_contains(self, text: str) -> int:
+        if self._parent is None and self._lower_names is None and text not in self._name_contains:
+            self._name_contains[text] = self._ask_shards("name_contains", text)
+        return super().name_contains(text)
+
+    def name_word(self, word: str) -> int:
+        if self._parent is None and self._lower_names is None and word not in self._name_words:
+            self._name_words[word] = self._ask_shards("name_word", word)
+        return super().name_word(word)
+
+
+class ShardedRecommender:
+    """recommend_outfits over a wardrobe split across shard processes (or in-process shards)"""
+
+    def __init__(self, source: Source, shards: int = 4, processes: bool = True, engine=None,
+                 cache_size: int = DEFAULT_CACHE_SIZE):
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+        self._engine = engine or load_engine()
+        # Prompt parsing only: analyze_occasion/extract_requirements don't touch the wardrobe
+        self._parser = self._engine.SmartOutfitRecommender([])
+        self.shards = shards
+        self.path = source if isinstance(source, str) else "<memory>"
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[int, Dict]" = OrderedDict()
+        self.recent_outfits = defaultdict(list)
+        self.recent_combinations = defaultdict(list)
+        self.last_strategy = None
+        # Candidates of the last request; items fetched from the shards, in all and by the last request
+        self.last_candidates = 0
+        self.fetched = 0
+        self.last_fetched = 0
+        self.shard_sizes: List[int] = []
+        self._lock = threading.RLock()
+        self._local: Optional[List[Shard]] = None
+        self._workers = []
+        if not processes:
+            if isinstance(source, str):
+                from wardrobe_file import load_wardrobe
+                source = load_wardrobe(source)
+            self._local = [Shard(part, self._engine) for part in partition(source, shards)]
+            self.shard_sizes = [len(shard.positions()) for shard in self._local]
+        else:
+            self._start(source)
+        try:
+            self._connect()
+        except BaseException:
+            self.close()
+            raise
+
+    def _start(self, source: Source) -> None:
+        import multiprocessing
+        # A path is read by each shard process itself; a list is split here and each part sent to its shard
+        parts = [source] * self.shards if isinstance(source, str) else partition(source, self.shards)
+        try:
+            for shard in range(self.shards):
+                parent, child = multiprocessing.Pipe()
+                process = multiprocessing.Process(target=_serve, args=(child, parts[shard], shard, self.shards),
+                                                  name=f"wardrobe-shard-{shard}", daemon=True)
+                process.start()
+                child.close()
+                self._workers.append((process, parent))
+            for _, conn in self._workers:
+                status, value = conn.recv()
+                if status != "ready":
+                    raise RuntimeError(f"shard failed to load: {value}")
+                self.shard_sizes.append(value)
+        except BaseException:
+            self.close()
+            raise
+
+    def _connect(self) -> None:
+        """Learn which shard holds each position, and merge the shards' tag x category counts"""
+        self.count = sum(self.shard_sizes)
+        owner = self._owner = array("H", [0]) * self.count
+        for shard, positions in enumerate(self.broadcast("positions")):
+            for pos in positions:
+                owner[pos] = shard
+        # The whole wardrobe's counts, so feasibility checks agree with a single recommender's
+        self.catalog = CardinalityCatalog()
+        for part in self.broadcast("catalog"):
+            self.catalog.merge(part)
+        self._items = ShardedItems(self)
+
+    # --- talking to the shards ---
+    def broadcast(self, op: str, *args) -> List:
+        """Run a Shard operation on every shard (in parallel when they are processes); results in shard order"""
+        return self._ask({shard: args for shard in range(self.shards)}, op)
+
+    def _ask(self, requests: Dict[int, tuple], op: str) -> List:
+        with self._lock:
+            if self._local is not None:
+                return [getattr(self._local[shard], op)(*args) for shard, args in requests.items()]
+            for shard, args in requests.items():
+                self._workers[shard][1].send((op, args))
+            results = []
+            for shard in requests:
+                status, value = self._workers[shard][1].recv()
+                if status != "ok":
+                    raise RuntimeError(f"shard {shard} {op} failed: {value}")
+                results.append(value)
+            return results
+
+    def _lower_names(self) -> List[str]:
+        names = [""] * self.count
+        for part in self.broadcast("lower_names"):
+            for pos, name in part:
+                names[pos] = name
+        return names
+
+    def item(self, pos: int) -> Dict:
+        return self.take([pos])[0]
+
+    def take(self, positions: Sequence[int]) -> List[Dict]:
+        """Items at these global positions, from the cache or fetched in one request per shard that has any"""
+        with self._lock:
+            cache = self._cache
+            missing: Dict[int, List[int]] = defaultdict(list)
+            for pos in positions:
+                if pos not in cache:
+                    missing[self._owner[pos]].append(pos)
+            if missing:
+                for wanted, items in zip(missing.values(), self._ask({s: (p,) for s, p in missing.items()}, "take")):
+                    cache.update(zip(wanted, items))
+                    self.fetched += len(wanted)
+            items = []
+            for pos in positions:
+                items.append(cache[pos])
+                cache.move_to_end(pos)
+            while len(cache) > self.cache_size:
+                cache.popitem(last=False)
+            return items
+
+    # --- recommendations ---
+    def request_index(self, occasions: List[str], required: List[str]) -> ShardedTagIndex:
+        """Index of the request's candidates: every shard's candidate postings, ORed"""
+        candidates = 0
+        tags: Dict[str, int] = defaultdict(int)
+        categories: Dict[str, int] = defaultdict(int)
+        name_contains: Dict[str, int] = defaultdict(int)
+        name_words: Dict[str, int] = defaultdict(int)
+        for bits, *postings in self.broadcast("candidates", occasions, required):
+            candidates |= bits
+            for merged, part in zip((tags, categories, name_contains, name_words), postings):
+                for key, key_bits in part.items():
+                    merged[key] |= key_bits
+        index = ShardedTagIndex.from_postings(self._items, dict(tags), dict(categories), self._lower_names,
+                                              name_contains, name_words)
+        index.all = candidates
+        index.shards = self
+        return index
+
+    def recommend_outfits(self, prompt: str) -> Dict:
+        """Same result as SmartOutfitRecommender.recommend_outfits over the whole wardrobe"""
+        occasions = self._parser.analyze_occasion(prompt)
+        required, _, _ = self._parser.extract_requirements(prompt)
+        index = self.request_index(occasions, required)
+        self.last_candidates = index.all.bit_count()
+        recommender = self._engine.SmartOutfitRecommender([])
+        recommender.wardrobe_db = self._items
+        recommender._tag_index = index
+        recommender._cardinality = self.catalog
+        recommender._mark_indexed()
+        recommender.recent_outfits = self.recent_outfits
+        recommender.recent_combinations = self.recent_combinations
+        fetched = self.fetched
+        result = recommender.recommend_outfits(prompt)
+        self.last_fetched = self.fetched - fetched
+        self.last_strategy = recommender.last_strategy
+        return result
+
+    def close(self) -> None:
+        for process, conn in self._workers:
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+            conn.close()
+        for process, _ in self._workers:
+            process.join(5)
+            if process.is_alive():
+                process.terminate()
+        self._workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recommend outfits from a wardrobe sharded across processes")
+    parser.add_argument("prompts", nargs="+", help="prompts to run")
+    parser.add_argument("--wardrobe", help="wardrobe file (.json/.jsonl/.snap) instead of the bundled wardrobe_db")
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE,
+                        help="items the coordinator keeps after fetching them from the shards")
+    args = parser.parse_args(argv)
+
+    source = args.wardrobe or load_engine().wardrobe_db
+    with ShardedRecommender(source, args.shards, cache_size=args.cache_size) as sharded:
+        print(json.dumps({"shards": sharded.shard_sizes}), file=sys.stderr)
+        for prompt in args.prompts:
+            result = sharded.recommend_outfits(prompt)
+            print(json.dumps({"prompt": prompt, "strategy": sharded.last_strategy,
+                              "candidates": sharded.last_candidates, "fetched": sharded.last_fetched,
+                              "outfits": [[item["id"] for item in outfit["items"]] for outfit in result["outfits"]]}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""Per-stage timing hooks for SmartOutfitRecommender.recommend_outfits.
+
+Assign a StageTimer to recommender.stage_hooks and every request records
+how long each stage took (monotonic clock) into a fixed-bucket histogram.
+Per-request outcomes (detected occasion, strategy branch, whether the
+fallback ran, empty responses) and engine cache lookups are counted too.
+With stage_hooks left at None the engine only pays one `is None` check per
+stage.
+
+    timer = StageTimer()
+    recommender.stage_hooks = timer
+    recommender.recommend_outfits("party in red")
+    print(timer.report())
+"""
+
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Sequence
+
+STAGES = [
+    "get_context",
+    "analyze_occasion",
+    "extract_requirements",
+    "color_priority",
+    "strategy",
+    "fallback",
+    "prioritize_color_outfits",
+    "generate_outfit_html",
+]
+# Upper bucket bounds in seconds: 10us .. 10s, roughly 2.5 buckets per decade
+DEFAULT_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Histogram:
+    """Counts observations into fixed buckets; the last bucket is +Inf"""
+
+    __slots__ = ("bounds", "counts", "count", "total", "min", "max")
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "Histogram") -> None:
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile as the upper bound of the bucket that holds it"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.50) * 1000, 3),
+            "p95_ms": round(self.quantile(0.95) * 1000, 3),
+            "p99_ms": round(self.quantile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class StageTimer:
+    """Stage hooks that keep one histogram per stage and counters for request events"""
+
+    clock = staticmethod(time.perf_counter)
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.stages: Dict[str, Histogram] = defaultdict(lambda: Histogram(self.bounds))
+        self.events: Dict[str, Counter] = defaultdict(Counter)
+
+    def start(self) -> float:
+        """Timestamp the beginning of a request"""
+        return self.clock()
+
+    def lap(self, stage: str, started: float) -> float:
+        """Record the time since `started` against stage and return the new timestamp"""
+        now = self.clock()
+        self.stages[stage].observe(now - started)
+        return now
+
+    def event(self, name: str, value) -> None:
+        """Count a per-request outcome, e.g. event("strategy", "funeral")"""
+        self.events[name][value] += 1
+
+    def cache(self, name: str, hit: bool) -> None:
+        """Count a cache lookup made by the engine"""
+        self.events["cache:" + name]["hit" if hit else "miss"] += 1
+
+    def report(self, stages: Optional[List[str]] = None) -> Dict:
+        names = stages or [s for s in STAGES if s in self.stages] + sorted(set(self.stages) - set(STAGES))
+        return {
+            "stages": {name: self.stages[name].summary() for name in names if name in self.stages},
+            "events": {name: dict(counter) for name, counter in self.events.items()},
+        }
@@ -0,0 +1,157 @@
+"""Synthetic wardrobe and prompt generator for scale testing.
+
+Items follow the wardrobe_db schema (id, name, category, tags, image) and
+the tag patterns of the bundled wardrobe: every item starts from a real
+item's style bundle (sporty, ethnic/ritual, party, formal, ...), may drop a
+tag or pick up one that co-occurs with it in wardrobe_db, and gets colors
+drawn from the colors that appear together there. Output is deterministic
+for a given seed and written as streaming JSON Lines, so million item
+catalogs never have to sit in memory.
+
+Usage:
+    python synth_wardrobe.py items --count 1000000 --seed 1 --out wardrobe.jsonl
+    python synth_wardrobe.py prompts --count 10000 --seed 1 --out prompts.jsonl
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+from bisect import bisect
+from collections import Counter, defaultdict
+from itertools import accumulate
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from engine_loader import load_engine
+
+OCCASION_PHRASES = [
+    "office meeting", "business meeting", "interview", "funeral", "party tonight", "office party",
+    "beach party", "wedding", "date night", "ritual at temple", "festival", "office ritual ceremony",
+    "casual outing", "picnic", "shopping", "swimming", "gym workout", "hiking", "trekking", "yoga",
+    "camping", "running", "cycling",
+]
+LAYER_WORDS = ["layer", "jacket", "blazer", "sweater", "coat", "cardigan"]
+# Extra color spellings that show up in wardrobe_db tags
+EXTRA_COLORS = {"grey", "dark-blue", "pine-green", "aquamarine", "light", "dark"}
+
+
+class _Weighted:
+    """Weighted choice over a fixed population with O(log n) draws"""
+
+    def __init__(self, counts: Dict[str, int]):
+        self.population = sorted(counts)
+        self.cum = list(accumulate(counts[k] for k in self.population))
+
+    def draw(self, rng: random.Random) -> str:
+        return self.population[bisect(self.cum, rng.random() * self.cum[-1])]
+
+
+class WardrobeModel:
+    """Tag statistics of a seed wardrobe, used to sample look-alike items"""
+
+    def __init__(self, base: Sequence[Dict], color_names: Sequence[str]):
+        colors = set(color_names) | EXTRA_COLORS
+        self.templates: Dict[str, List[Tuple[str, List[str], str]]] = defaultdict(list)
+        category_counts: Counter = Counter()
+        color_counts: Counter = Counter()
+        pair_counts: Dict[str, Counter] = defaultdict(Counter)
+        color_pairs: Dict[str, Counter] = defaultdict(Counter)
+        for item in base:
+            tags = list(dict.fromkeys(item.get("tags", [])))
+            style = [t for t in tags if t not in colors]
+            item_colors = [t for t in tags if t in colors]
+            category = item.get("category", "unknown")
+            stem = re.sub(r"\d+$", "", item["name"]).strip("_") or category
+            self.templates[category].append((stem, style, item.get("image", "")))
+            category_counts[category] += 1
+            color_counts.update(item_colors)
+            for a in style:
+                for b in style:
+                    if a != b:
+                        pair_counts[a][b] += 1
+            for a in item_colors:
+                for b in item_colors:
+                    if a != b:
+                        color_pairs[a][b] += 1
+        self.categories = _Weighted(category_counts)
+        self.colors = _Weighted(color_counts)
+        self.cooccurring = {tag: _Weighted(c) for tag, c in pair_counts.items()}
+        self.color_partners = {color: _Weighted(c) for color, c in color_pairs.items()}
+
+    def sample(self, rng: random.Random, index: int, id_prefix: str = "SYN") -> Dict:
+        category = self.categories.draw(rng)
+        stem, style, image = rng.choice(self.templates[category])
+        # Keep the bundle mostly intact; its leading tag always survives
+        tags = style[:1] + [t for t in style[1:] if rng.random() > 0.1]
+        if tags and rng.random() < 0.25:
+            anchor = rng.choice(tags)
+            if anchor in self.cooccurring:
+                tags.append(self.cooccurring[anchor].draw(rng))
+        color = self.colors.draw(rng)
+        tags.append(color)
+        if rng.random() < 0.35 and color in self.color_partners:
+            tags.append(self.color_partners[color].draw(rng))
+        return {
+            "id": f"{id_prefix}{index:08d}",
+            "name": f"{stem}{index}",
+            "category": category,
+            "tags": list(dict.fromkeys(tags)),
+            "image": image,
+        }
+
+
+def _default_model() -> Tuple[WardrobeModel, List[str]]:
+    engine = load_engine()
+    color_names = list(engine.SmartOutfitRecommender([]).color_variants)
+    return WardrobeModel(engine.wardrobe_db, color_names), color_names
+
+
+def generate_items(count: int, seed: int = 0, model: Optional[WardrobeModel] = None,
+                   id_prefix: str = "SYN") -> Iterator[Dict]:
+    """Yield `count` synthetic items; the same seed always yields the same items"""
+    model = model or _default_model()[0]
+    rng = random.Random(seed)
+    for i in range(count):
+        yield model.sample(rng, i, id_prefix)
+
+
+def generate_prompts(count: int, seed: int = 0, color_names: Optional[Sequence[str]] = None) -> Iterator[str]:
+    """Yield prompts mixing occasions with color and layer constraints"""
+    color_names = list(color_names or _default_model()[1])
+    rng = random.Random(seed)
+    for _ in range(count):
+        prompt = rng.choice(OCCASION_PHRASES)
+        if rng.random() < 0.3:
+            prompt += f" in {rng.choice(color_names)}"
+        roll = rng.random()
+        if roll < 0.15:
+            prompt += f" with {rng.choice(LAYER_WORDS)}"
+        elif roll < 0.2:
+            prompt += f" no {rng.choice(LAYER_WORDS)}"
+        yield prompt
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic wardrobes or prompt corpora as JSONL")
+    parser.add_argument("kind", choices=["items", "prompts"])
+    parser.add_argument("--count", type=int, required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="-", help="output path, '-' for stdout")
+    args = parser.parse_args(argv)
+
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    try:
+        if args.kind == "items":
+            for item in generate_items(args.count, args.seed):
+                out.write(json.dumps(item, separators=(",", ":")) + "\n")
+        else:
+            for prompt in generate_prompts(args.count, args.seed):
+                out.write(json.dumps({"prompt": prompt}) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""Many users' wardrobes in one process: a tenant registry with LRU eviction.
+
+Each tenant has its own wardrobe and its own SmartOutfitRecommender, but the
+read-only tables are shared: the color tables live once in the engine module
+(COLOR_VARIANTS, COLOR_WEIGHTS, color expansions) and the compiled occasion
+rules once in occasion_rules.RULES. What a tenant adds is its items and,
+while it is warm, its tag index, counts and planner masks.
+
+Indexes are built on a tenant's first request, not at register(). After each
+request the registry totals the warm tenants' index memory
+(SmartOutfitRecommender.index_bytes) and, while it is over memory_budget,
+evicts the least recently used tenants other than the one just served:
+
+- a tenant registered with a list of items keeps its items and recommender;
+  only the index and derived caches are dropped (drop_index)
+- a tenant registered with a path (.json/.jsonl/.snap/.db) drops its
+  recommender and reopens the file on its next request
+
+Either way the tenant's recent-outfit history is kept, so eviction doesn't
+change which outfits it is shown next.
+
+    registry = TenantRegistry(memory_budget=64 * 2**20)
+    registry.register("alice", "wardrobes/alice.snap")
+    registry.register("bob", bob_items)
+    result = registry.recommend_outfits("alice", "party in red")
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Union
+
+from engine_loader import load_engine
+
+DEFAULT_MEMORY_BUDGET = 256 * 2**20
+
+Source = Union[str, List[Dict]]
+
+
+class Tenant:
+    """One tenant's wardrobe source, its recommender while warm, and its recent-outfit history"""
+
+    def __init__(self, tenant_id: str, source: Source):
+        self.tenant_id = tenant_id
+        self.source = source
+        self.recommender = None
+        self.store = None
+        self.index_bytes = 0
+        self.requests = 0
+        self.builds = 0
+        self.evictions = 0
+        self.history = None
+        self.lock = threading.Lock()
+
+    @property
+    def warm(self) -> bool:
+        return self.index_bytes > 0
+
+
+class TenantRegistry:
+    """Per-tenant recommenders over shared tables, with tenant indexes evicted LRU under memory_budget"""
+
+    def __init__(self, memory_budget: int = DEFAULT_MEMORY_BUDGET, engine=None,
+                 on_evict: Optional[Callable[[Tenant], None]] = None):
+        self.memory_budget = memory_budget
+        self.on_evict = on_evict
+        self._engine = engine or load_engine()
+        self._tenants: Dict[str, Tenant] = {}
+        # Warm tenants, least recently used first
+        self._lru: "OrderedDict[str, Tenant]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.index_bytes = 0
+        self.evictions = 0
+
+    # --- tenants ---
+    def register(self, tenant_id: str, source: Source) -> Tenant:
+        """Add a tenant (or replace its wardrobe) from a list of items or a wardrobe path; nothing is built yet"""
+        with self._lock:
+            old = self._tenants.get(tenant_id)
+            if old is not None:
+                self._forget(old)
+            tenant = self._tenants[tenant_id] = Tenant(tenant_id, source)
+            return tenant
+
+    def unregister(self, tenant_id: str) -> None:
+        with self._lock:
+            tenant = self._tenants.pop(tenant_id)
+            self._forget(tenant)
+
+    def _forget(self, tenant: Tenant) -> None:
+        if self._lru.pop(tenant.tenant_id, None) is not None:
+            self.index_bytes -= tenant.index_bytes
+        if tenant.store is not None:
+            tenant.store.close()
+
+    def __contains__(self, tenant_id: str) -> bool:
+        return tenant_id in self._tenants
+
+    def __len__(self) -> int:
+        return len(self._tenants)
+
+    def tenant(self, tenant_id: str) -> Tenant:
+        try:
+            return self._tenants[tenant_id]
+        except KeyError:
+            raise KeyError(f"unknown tenant {tenant_id!r}") from None
+
+    # --- requests ---
+    def recommend_outfits(self, tenant_id: str, prompt: str, **kwargs) -> Dict:
+        """Run prompt on tenant_id's wardrobe (requests for one tenant run one at a time)"""
+        tenant = self.tenant(tenant_id)
+        with tenant.lock:
+            recommender = self._recommender(tenant)
+            result = recommender.recommend_outfits(prompt, **kwargs)
+            tenant.requests += 1
+            self._account(tenant, recommender.index_bytes())
+        self._evict_over_budget(keep=tenant)
+        return result
+
+    def _recommender(self, tenant: Tenant):
+        recommender = tenant.recommender
+        if recommender is None:
+            recommender = tenant.recommender = self._open(tenant)
+            if tenant.history is not None:
+                recommender.recent_outfits, recommender.recent_combinations = tenant.history
+                tenant.history = None
+        if not tenant.warm:
+            tenant.builds += 1
+        return recommender
+
+    def _open(self, tenant: Tenant):
+        source, engine = tenant.source, self._engine
+        if not isinstance(source, str):
+            return engine.SmartOutfitRecommender(source)
+        if source.endswith(".snap"):
+            return engine.SmartOutfitRecommender.from_snapshot(source)
+        if source.endswith((".db", ".sqlite")):
+            if tenant.store is None:
+                from wardrobe_sqlite import WardrobeStore
+                tenant.store = WardrobeStore(source)
+            return engine.SmartOutfitRecommender.from_store(tenant.store)
+        from wardrobe_file import load_wardrobe
+        return engine.SmartOutfitRecommender(load_wardrobe(source))
+
+    def _account(self, tenant: Tenant, index_bytes: int) -> None:
+        with self._lock:
+            if self._tenants.get(tenant.tenant_id) is not tenant:
+                return  # unregistered or replaced while the request ran
+            self.index_bytes += index_bytes - tenant.index_bytes
+            tenant.index_bytes = index_bytes
+            self._lru[tenant.tenant_id] = tenant
+            self._lru.move_to_end(tenant.tenant_id)
+
+    def _evict_over_budget(self, keep: Tenant) -> None:
+        while self.index_bytes > self.memory_budget:
+            with self._lock:
+                victim = next((t for t in self._lru.values() if t is not keep and not t.lock.locked()), None)
+            if victim is None or not self.evict(victim.tenant_id):
+                return
+
+    def evict(self, tenant_id: str) -> bool:
+        """Drop a tenant's index (and, for a path-backed tenant, its recommender); False if it was busy or cold"""
+        tenant = self.tenant(tenant_id)
+        if not tenant.lock.acquire(blocking=False):
+            return False
+        try:
+            with self._lock:
+                if self._lru.pop(tenant_id, None) is None:
+                    return False
+                self.index_bytes -= tenant.index_bytes
+                tenant.index_bytes = 0
+            recommender = tenant.recommender
+            # A store-backed wardrobe only holds local edits once they detached it from the store
+            store_view = tenant.store is not None and not recommender.wardrobe_db.detached
+            if isinstance(tenant.source, str) and (store_view or not recommender.wardrobe_version):
+                tenant.history = (recommender.recent_outfits, recommender.recent_combinations)
+                tenant.recommender = None
+            else:
+                if isinstance(tenant.source, str):
+                    # Edited through add_item/update_item/remove_item: keep the edits instead of the file
+                    recommender.wardrobe_db = tenant.source = list(recommender.wardrobe_db)
+                recommender.drop_index()
+            tenant.evictions += 1
+            self.evictions += 1
+        finally:
+            tenant.lock.release()
+        if self.on_evict is not None:
+            self.on_evict(tenant)
+        return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "tenants": len(self._tenants),
+                "warm": len(self._lru),
+                "index_bytes": self.index_bytes,
+                "memory_budget": self.memory_budget,
+                "evictions": self.evictions,
+            }
+
+
+def _serve_line(registry: TenantRegistry, line_no: int, line: str) -> Dict:
+    """The output record for one JSONL request line: its outfits, or (as batch_cli does) an error record"""
+    try:
+        request = json.loads(line)
+    except ValueError as e:
+        return {"line": line_no, "error": f"invalid JSON ({e})"}
+    if not isinstance(request, dict):
+        return {"line": line_no, "error": "request is not a JSON object"}
+    tenant, prompt = request.get("tenant"), request.get("prompt")
+    for field, value in (("tenant", tenant), ("prompt", prompt)):
+        if not isinstance(value, str):
+            return {"line": line_no, "error": f"no {field!r} string in request"}
+    if tenant not in registry:
+        return {"line": line_no, "tenant": tenant, "error": f"unknown tenant {tenant!r}"}
+    try:
+        result = registry.recommend_outfits(tenant, prompt)
+    except Exception as e:
+        return {"line": line_no, "tenant": tenant, "prompt": prompt, "error": f"{type(e).__name__}: {e}"}
+    return {"line": line_no, "tenant": tenant, "prompt": prompt,
+            "outfits": [[item["id"] for item in outfit["items"]] for outfit in result["outfits"]]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve prompts for many tenants' wardrobes under a memory budget")
+    parser.add_argument("wardrobes", help="directory of wardrobe files; each file's stem is a tenant id")
+    parser.add_argument("requests", nargs="?", default="-",
+                        help="JSONL requests {\"tenant\": ..., \"prompt\": ...}, '-' for stdin")
+    parser.add_argument("--budget-mb", type=float, default=DEFAULT_MEMORY_BUDGET / 2**20)
+    args = parser.parse_args(argv)
+
+    registry = TenantRegistry(memory_budget=int(args.budget_mb * 2**20))
+    for name in sorted(os.listdir(args.wardrobes)):
+        stem, ext = os.path.splitext(name)
+        if ext in (".json", ".jsonl", ".snap", ".db", ".sqlite"):
+            registry.register(stem, os.path.join(args.wardrobes, name))
+    if not len(registry):
+        parser.error(f"no wardrobe files in {args.wardrobes}")
+
+    stream = sys.stdin if args.requests == "-" else open(args.requests, encoding="utf-8")
+    errors = 0
+    try:
+        for line_no, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            record = _serve_line(registry, line_no, line)
+            errors += "error" in record
+            sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    print(json.dumps(registry.stats()), file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
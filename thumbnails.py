@@ -0,0 +1,176 @@
+"""Batch thumbnail builder for the item images in static/.
+
+The recommendations page shows every item at 120x120, so serving the full
+size originals wastes bandwidth. This builds resized JPEG variants into a
+cache directory, in a process pool, and only redoes images whose mtime or
+content hash changed since the last run. The renderer reads the resulting
+index.json once and emits the variants through srcset.
+
+Resizing needs Pillow (pip install Pillow); the index can be read without it.
+
+Usage: python thumbnails.py [--static static] [--cache static/thumbs] [--workers 4] [--force]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+CACHE_DIR = os.path.join(STATIC_DIR, "thumbs")
+INDEX_NAME = "index.json"
+# 1x and 2x of the 120px box the page displays items in
+THUMB_WIDTHS = (120, 240)
+IMAGE_EXTENSIONS = (".jpeg", ".jpg", ".png", ".webp")
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 16) -> str:
+    """Hash a file's content without reading it into memory at once"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def thumb_name(image: str, width: int) -> str:
+    stem, _ = os.path.splitext(image)
+    return f"{stem}-{width}.jpeg"
+
+
+def _write_atomic_json(path: str, data) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def load_index(cache_dir: str = CACHE_DIR) -> Dict[str, Dict]:
+    """Load the thumbnail index (image filename -> entry); empty if never built"""
+    try:
+        with open(os.path.join(cache_dir, INDEX_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _resize_one(job: Tuple[str, str, str, Tuple[int, ...]]) -> Tuple[str, Dict[str, str], Optional[str]]:
+    """Worker: write every width variant of one image, return (image, {width: thumb filename}, error)"""
+    from PIL import Image, ImageOps
+
+    image, src_path, cache_dir, widths = job
+    variants = {}
+    tmp_path = None
+    try:
+        with Image.open(src_path) as img:
+            img = ImageOps.exif_transpose(img).convert("RGB")
+            for width in widths:
+                thumb = img.copy()
+                thumb.thumbnail((width, width))
+                name = thumb_name(image, width)
+                fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    thumb.save(f, "JPEG", quality=82, optimize=True, progressive=True)
+                os.replace(tmp_path, os.path.join(cache_dir, name))
+                tmp_path = None
+                variants[str(width)] = name
+    except Exception as e:
+        # One unreadable image must not cost the rest of the build
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return image, {}, f"{type(e).__name__}: {e}"
+    return image, variants, None
+
+
+def build_thumbnails(static_dir: str = STATIC_DIR, cache_dir: str = CACHE_DIR,
+                     widths: Tuple[int, ...] = THUMB_WIDTHS, workers: Optional[int] = None,
+                     force: bool = False) -> Dict[str, int]:
+    """Bring the thumbnail cache up to date and return counts of what was done.
+
+    An image is skipped when its mtime and size match the index; if only the
+    mtime moved, its content hash decides whether it really changed. Images
+    that fail to resize are left out of the index (so the page uses the
+    original and the next run retries them) and listed under "errors"; the
+    index is still written for everything else.
+    """
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        raise ImportError("Building thumbnails requires Pillow: pip install Pillow")
+
+    os.makedirs(cache_dir, exist_ok=True)
+    index = {} if force else load_index(cache_dir)
+    wanted = sorted(str(w) for w in widths)
+    stats = {"built": 0, "unchanged": 0, "removed": 0, "failed": 0, "errors": {}}
+    jobs: List[Tuple[str, str, str, Tuple[int, ...]]] = []
+    seen = set()
+
+    for entry in os.scandir(static_dir):
+        if not entry.is_file() or not entry.name.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        seen.add(entry.name)
+        st = entry.stat()
+        cached = index.get(entry.name)
+        if cached and sorted(cached.get("variants", {})) == wanted and all(
+                os.path.exists(os.path.join(cache_dir, name)) for name in cached["variants"].values()):
+            if cached["mtime"] == st.st_mtime and cached["size"] == st.st_size:
+                stats["unchanged"] += 1
+                continue
+            digest = file_sha256(entry.path)
+            if digest == cached["sha256"]:
+                cached.update(mtime=st.st_mtime, size=st.st_size)
+                stats["unchanged"] += 1
+                continue
+        else:
+            digest = file_sha256(entry.path)
+        index[entry.name] = {"mtime": st.st_mtime, "size": st.st_size, "sha256": digest, "variants": {}}
+        jobs.append((entry.name, entry.path, cache_dir, tuple(widths)))
+
+    # Drop thumbnails of images that no longer exist
+    for image in [name for name in index if name not in seen]:
+        for name in index.pop(image).get("variants", {}).values():
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except OSError:
+                pass
+        stats["removed"] += 1
+
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for image, variants, error in pool.map(_resize_one, jobs, chunksize=8):
+                if error is not None:
+                    del index[image]
+                    stats["failed"] += 1
+                    stats["errors"][image] = error
+                    continue
+                index[image]["variants"] = variants
+                stats["built"] += 1
+
+    _write_atomic_json(os.path.join(cache_dir, INDEX_NAME), index)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build resized thumbnails for static/ item images")
+    parser.add_argument("--static", default=STATIC_DIR, help="directory with the original images")
+    parser.add_argument("--cache", default=CACHE_DIR, help="directory to write thumbnails and index.json to")
+    parser.add_argument("--widths", default=",".join(map(str, THUMB_WIDTHS)), help="comma separated widths")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="rebuild everything, ignoring the index")
+    args = parser.parse_args(argv)
+    widths = tuple(int(w) for w in args.widths.split(",") if w)
+    stats = build_thumbnails(args.static, args.cache, widths, args.workers, args.force)
+    print(f"Thumbnails: {stats['built']} built, {stats['unchanged']} unchanged, {stats['removed']} removed, "
+          f"{stats['failed']} failed")
+    for image, error in sorted(stats["errors"].items()):
+        print(f"  {image}: {error}", file=sys.stderr)
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""Reading and writing wardrobe catalogs on disk.
+
+A wardrobe file holds items with the same schema as wardrobe_db in PRO.PY
+(id, name, category, tags, image). Two layouts are understood: a JSON list
+(.json) and JSON Lines (.jsonl, one item per line), which can be streamed
+without loading the whole catalog. Binary snapshots (.snap, see
+wardrobe_snapshot) can be read too, but are written with write_snapshot.
+"""
+
+import json
+import os
+import tempfile
+from typing import Dict, Iterable, Iterator, List
+
+
+def iter_jsonl(path: str) -> Iterator[Dict]:
+    """Yield items from a JSON Lines file one at a time, skipping blank lines"""
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{line_no}: invalid JSON ({e})") from None
+
+
+def iter_wardrobe(path: str) -> Iterator[Dict]:
+    """Yield the items of a wardrobe file, whatever its layout"""
+    if path.endswith(".jsonl"):
+        yield from iter_jsonl(path)
+        return
+    if path.endswith(".snap"):
+        from wardrobe_snapshot import WardrobeSnapshot
+        with WardrobeSnapshot(path) as snapshot:
+            yield from (snapshot.item(i) for i in range(snapshot.count))
+        return
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, list):
+        raise ValueError(f"{path}: expected a JSON list of wardrobe items")
+    yield from data
+
+
+def load_wardrobe(path: str) -> List[Dict]:
+    """Load a whole wardrobe file into a list"""
+    return list(iter_wardrobe(path))
+
+
+def write_wardrobe(items: Iterable[Dict], path: str) -> int:
+    """Write items to path (layout picked by extension) atomically; returns the item count"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    count = 0
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            if path.endswith(".jsonl"):
+                for item in items:
+                    f.write(json.dumps(item, separators=(",", ":")) + "\n")
+                    count += 1
+            else:
+                items = list(items)
+                json.dump(items, f)
+                count = len(items)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
@@ -0,0 +1,343 @@
+"""Binary wardrobe snapshots, opened with mmap for near-instant startup.
+
+A snapshot holds everything the engine would otherwise compute from a
+wardrobe file on start: the tag and category vocabularies, the inverted
+index (one bitset row per tag and per category), the tag x category counts
+behind the cardinality catalog, and precomputed color sets (for every color
+word the engine matches on, which item names contain it as a substring and as
+a whole word). Item records are kept as compact JSON and decoded one at a
+time, on first access.
+
+Layout (all integers little-endian):
+
+    magic     8 bytes   b"GMALSNAP"
+    version   u32       FORMAT_VERSION
+    dir_len   u32       length of the directory
+    directory JSON      counts, vocabularies, tag x category counts, section offsets
+    rows      n_rows x row_bytes bitsets: tags, categories, color substrings, color words
+    names     lower-cased item names, NUL-separated
+    offsets   (n_items + 1) x u64 offsets of the item records
+    records   compact JSON per item
+
+Opening one is an open + mmap + reading the directory; the postings become
+Python ints with one int.from_bytes per row, and nothing is parsed per item
+until an item is used.
+
+    python wardrobe_snapshot.py build items.jsonl wardrobe.snap
+    python wardrobe_snapshot.py info wardrobe.snap
+
+    recommender = SmartOutfitRecommender.from_snapshot("wardrobe.snap")
+
+Snapshots are replaced, never rewritten in place (write_snapshot renames a
+temporary file over the target), so a process that still has the old one
+mapped keeps reading the old file.
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from collections.abc import MutableSequence
+from typing import Dict, Iterable, List, Optional
+
+from cardinality import CardinalityCatalog
+from tag_index import TagIndex
+
+MAGIC = b"GMALSNAP"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sII")
+_OFFSET = struct.Struct("<Q")
+
+
+def engine_color_words() -> List[str]:
+    """Every color word the engine matches item names against"""
+    from engine_loader import load_engine
+    recommender = load_engine().SmartOutfitRecommender([])
+    words = set()
+    for color in recommender.color_variants:
+        words.update(recommender._expand_color_requirements(color))
+    return sorted(words)
+
+
+def write_snapshot(items: Iterable[Dict], path: str, color_words: Optional[Iterable[str]] = None) -> Dict:
+    """Write items as a snapshot at path (atomically); returns the directory.
+
+    Items are stored with the fields the engine fills in on load (tags, category),
+    so an engine opened on the snapshot never has to touch every item.
+    """
+    items = [dict(item, tags=item.get("tags", []), category=item.get("category", "unknown")) for item in items]
+    if color_words is None:
+        color_words = engine_color_words()
+    color_words = sorted(set(color_words))
+    index = TagIndex(items)
+    tags = sorted(index.tags)
+    categories = sorted(index.categories)
+    n = len(items)
+    row_bytes = (n + 7) // 8
+    rows = ([index.tags[t] for t in tags] + [index.categories[c] for c in categories]
+            + [index.name_contains(w) for w in color_words] + [index.name_word(w) for w in color_words])
+    records = [json.dumps(item, separators=(",", ":"), ensure_ascii=False).encode("utf-8") for item in items]
+    names = "\0".join(index._names()).encode("utf-8")
+    catalog = CardinalityCatalog(items)
+    tag_codes = {t: i for i, t in enumerate(tags)}
+    cat_codes = {c: i for i, c in enumerate(categories)}
+
+    digest = hashlib.blake2b(digest_size=16)
+    for record in records:
+        digest.update(record)
+        digest.update(b"\n")
+    directory = {
+        "items": n,
+        "row_bytes": row_bytes,
+        "tags": tags,
+        "categories": categories,
+        "color_words": color_words,
+        "pairs": sorted([tag_codes[t], cat_codes[c], count] for (t, c), count in catalog.pairs.items() if count),
+        "digest": digest.hexdigest(),
+    }
+    # Offsets are relative to the end of the directory, so they can be fixed before its length is known
+    rows_size = len(rows) * row_bytes
+    directory["sections"] = {
+        "rows": 0,
+        "names": rows_size,
+        "names_len": len(names),
+        "offsets": rows_size + len(names),
+        "records": rows_size + len(names) + (n + 1) * _OFFSET.size,
+    }
+    dir_bytes = json.dumps(directory, separators=(",", ":")).encode("utf-8")
+
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(dir_bytes)))
+            f.write(dir_bytes)
+            for bits in rows:
+                f.write(bits.to_bytes(row_bytes, "little"))
+            f.write(names)
+            offset = 0
+            for record in records:
+                f.write(_OFFSET.pack(offset))
+                offset += len(record)
+            f.write(_OFFSET.pack(offset))
+            for record in records:
+                f.write(record)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return directory
+
+
+class LazyItems(MutableSequence):
+    """A snapshot's (or other item source's) items as a list whose entries are decoded on first access.
+
+    source needs count, item(i) and path. Reads go straight to it; the first write
+    (append, del, ...) turns this into an ordinary list of the decoded items. Writes are
+    counted in version, as in the engine's WardrobeList.
+    """
+
+    def __init__(self, source):
+        self._source = source
+        self._list: Optional[List[Dict]] = None
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._list) if self._list is not None else self._source.count
+
+    def __getitem__(self, i):
+        if self._list is not None:
+            return self._list[i]
+        if isinstance(i, slice):
+            return [self._source.item(j) for j in range(*i.indices(self._source.count))]
+        count = self._source.count
+        if i < 0:
+            i += count
+        if not 0 <= i < count:
+            raise IndexError("wardrobe index out of range")
+        return self._source.item(i)
+
+    def __iter__(self):
+        if self._list is not None:
+            return iter(self._list)
+        return (self._source.item(i) for i in range(self._source.count))
+
+    def _materialize(self) -> List[Dict]:
+        if self._list is None:
+            self._list = [self._source.item(i) for i in range(self._source.count)]
+        return self._list
+
+    def __setitem__(self, i, value):
+        self._materialize()[i] = value
+        self.version += 1
+
+    def __delitem__(self, i):
+        del self._materialize()[i]
+        self.version += 1
+
+    def insert(self, i, value):
+        self._materialize().insert(i, value)
+        self.version += 1
+
+    def __repr__(self):
+        return f"<LazyItems {len(self)} items from {self._source.path}>"
+
+
+class WardrobeSnapshot:
+    """A snapshot file mapped into memory"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            if not os.fstat(f.fileno()).st_size:
+                raise ValueError(f"{path}: empty file, not a wardrobe snapshot")
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._open()
+        except BaseException:
+            self._mm.close()
+            raise
+
+    def _open(self) -> None:
+        mm = self._mm
+        if len(mm) < _HEADER.size:
+            raise ValueError(f"{self.path}: too short for a wardrobe snapshot")
+        magic, version, dir_len = _HEADER.unpack_from(mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path}: not a wardrobe snapshot")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{self.path}: snapshot format {version} (this build reads {FORMAT_VERSION})")
+        start = _HEADER.size + dir_len
+        try:
+            self.directory = json.loads(mm[_HEADER.size:start])
+        except ValueError as e:
+            raise ValueError(f"{self.path}: corrupt snapshot directory ({e})") from None
+        d = self.directory
+        try:
+            self.count = d["items"]
+            self.digest = d["digest"]
+            self._row_bytes = d["row_bytes"]
+            sections = d["sections"]
+            self._rows = start + sections["rows"]
+            self._names = (start + sections["names"], sections["names_len"])
+            self._offsets = start + sections["offsets"]
+            self._records = start + sections["records"]
+            end = self._records + _OFFSET.unpack_from(mm, self._offsets + self.count * _OFFSET.size)[0]
+        except (KeyError, TypeError, struct.error) as e:
+            raise ValueError(f"{self.path}: corrupt snapshot directory ({e!r})") from None
+        if end != len(mm):
+            raise ValueError(f"{self.path}: truncated or padded snapshot ({len(mm)} bytes, expected {end})")
+        self._decoded: List[Optional[Dict]] = [None] * self.count
+
+    # --- items ---
+    def item(self, i: int) -> Dict:
+        """Item i, decoded on first access"""
+        item = self._decoded[i]
+        if item is None:
+            start, end = struct.unpack_from("<QQ", self._mm, self._offsets + i * _OFFSET.size)
+            item = self._decoded[i] = json.loads(self._mm[self._records + start:self._records + end])
+        return item
+
+    @property
+    def items(self) -> LazyItems:
+        """A fresh lazy list over the items (decoded items are shared between lists)"""
+        return LazyItems(self)
+
+    def lower_names(self) -> List[str]:
+        start, length = self._names
+        if not self.count:
+            return []
+        return self._mm[start:start + length].decode("utf-8").split("\0")
+
+    # --- index ---
+    def _row(self, r: int) -> int:
+        start = self._rows + r * self._row_bytes
+        return int.from_bytes(self._mm[start:start + self._row_bytes], "little")
+
+    def tag_index(self) -> TagIndex:
+        """A TagIndex over items() built from the stored postings and color sets"""
+        d = self.directory
+        tags, categories, words = d["tags"], d["categories"], d["color_words"]
+        r = 0
+        tag_rows = {}
+        for tag in tags:
+            tag_rows[tag] = self._row(r)
+            r += 1
+        category_rows = {}
+        for category in categories:
+            category_rows[category] = self._row(r)
+            r += 1
+        name_contains = {}
+        for word in words:
+            name_contains[word] = self._row(r)
+            r += 1
+        name_words = {}
+        for word in words:
+            name_words[word] = self._row(r)
+            r += 1
+        return TagIndex.from_postings(self.items, tag_rows, category_rows, self.lower_names,
+                                      name_contains, name_words)
+
+    def catalog(self) -> CardinalityCatalog:
+        """The cardinality catalog, from the stored tag x category counts"""
+        d = self.directory
+        tags, categories = d["tags"], d["categories"]
+        catalog = CardinalityCatalog()
+        catalog.size = self.count
+        for tag_code, category_code, count in d["pairs"]:
+            tag, category = tags[tag_code], categories[category_code]
+            catalog.pairs[(tag, category)] = count
+            # Each item has one category, so a tag's item count is the sum over its categories
+            catalog.tags[tag] += count
+        # Categories come from their rows: an item without tags is in no pair
+        for r, category in enumerate(categories, len(tags)):
+            catalog.categories[category] = self._row(r).bit_count()
+        return catalog
+
+    def close(self) -> None:
+        """Unmap the file; items decoded so far stay usable"""
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect binary wardrobe snapshots")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="write a snapshot of a wardrobe file (default: the bundled wardrobe_db)")
+    build.add_argument("wardrobe", nargs="?", help="wardrobe file (.json/.jsonl)")
+    build.add_argument("out", help="snapshot path, e.g. wardrobe.snap")
+    info = sub.add_parser("info", help="print a snapshot's directory summary")
+    info.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        if args.wardrobe:
+            from wardrobe_file import iter_wardrobe
+            items = iter_wardrobe(args.wardrobe)
+        else:
+            from engine_loader import load_engine
+            items = load_engine().wardrobe_db
+        directory = write_snapshot(items, args.out)
+        print(f"{args.out}: {directory['items']} items, {len(directory['tags'])} tags, "
+              f"{len(directory['color_words'])} color words, {os.path.getsize(args.out)} bytes")
+        return 0
+    with WardrobeSnapshot(args.path) as snapshot:
+        d = snapshot.directory
+        print(json.dumps({"items": d["items"], "tags": len(d["tags"]), "categories": d["categories"],
+                          "color_words": len(d["color_words"]), "digest": d["digest"],
+                          "bytes": os.path.getsize(args.path)}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,532 @@
+"""SQLite-backed wardrobe store with indexed tag queries (stdlib sqlite3 only).
+
+For catalogs too big to keep as dicts in memory. Items live in a SQLite file:
+
+    items(pos, id, name_lower, category, record)   one row per item, record = compact JSON
+    item_tags(tag, category, pos)                   one row per (item, tag)
+
+pos is the item's wardrobe position (0..n-1, dense, in insertion order).
+item_tags' primary key (tag, category, pos) is a covering index for the
+"category X with any of tags T" lookups every candidate pool makes, and
+items(category, pos) serves category postings.
+
+The engine runs on a store through SqliteTagIndex: each tag, category and
+color-name lookup the strategies ask for is pushed down as one SQL query
+(tag IN (...), category = ?, instr()/a registered word-match function on the
+names) and the answer is kept as a bitset, so repeated requests cost what
+they cost on the in-memory index. Items are fetched by position through an
+LRU cache of hot rows. Only postings and the cache are in memory; records
+stay on disk.
+
+    store = WardrobeStore("wardrobe.db")
+    store.add_items(load_wardrobe("wardrobe.jsonl"))
+    recommender = SmartOutfitRecommender.from_store(store)
+
+    python wardrobe_sqlite.py import wardrobe.jsonl wardrobe.db
+    python wardrobe_sqlite.py query wardrobe.db topwear --any party fancy --none ethnic
+
+Connections come from a small pool (WAL mode, so readers on other threads
+are not blocked by a writer). Every write through a WardrobeStore bumps its
+version. Item lists and indexes taken from the store remember the version
+they were taken at and raise StaleStoreError once the store has moved on,
+instead of serving rows whose positions shifted; a recommender from
+from_store notices at the start of its next request and takes a fresh view
+(cheap: nothing is loaded up front). Writes by other processes, or by another
+WardrobeStore on the same file, don't bump the version: reopen the store to
+see them.
+"""
+
+import argparse
+import json
+import queue
+import re
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from cardinality import CardinalityCatalog
+from tag_index import TagIndex, bits_from_positions
+from wardrobe_snapshot import LazyItems
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_CACHE_SIZE = 4096
+# SQLite's default limit on host parameters per statement is 999
+_MAX_PARAMS = 900
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    pos INTEGER PRIMARY KEY,
+    id UNIQUE,
+    name_lower TEXT NOT NULL,
+    category TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_category ON items (category, pos);
+CREATE TABLE IF NOT EXISTS item_tags (
+    tag TEXT NOT NULL,
+    category TEXT NOT NULL,
+    pos INTEGER NOT NULL,
+    PRIMARY KEY (tag, category, pos)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS item_tags_pos ON item_tags (pos);
+"""
+
+
+def _word_match(word: str, name: str) -> int:
+    """SQL function: name has word on word boundaries (the engine's r'\\b(word)\\b')"""
+    return 1 if re.search(r'\b(' + word + r')\b', name) else 0
+
+
+def _placeholders(n: int) -> str:
+    return ",".join("?" * n)
+
+
+def _normalized(item: Dict) -> Dict:
+    # The fields SmartOutfitRecommender._initialize_wardrobe would fill in
+    return dict(item, tags=item.get("tags", []), category=item.get("category", "unknown"))
+
+
+class StaleStoreError(RuntimeError):
+    """A view of a WardrobeStore (items, tag index) was used after the store was written"""
+
+
+class ConnectionPool:
+    """Up to size sqlite3 connections to one database file, shared between threads"""
+
+    def __init__(self, path: str, size: int = DEFAULT_POOL_SIZE, timeout: float = 30.0):
+        if path == ":memory:" or path.startswith("file::memory:"):
+            raise ValueError(f"{path}: a pooled store needs a database file")
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self.closed = False
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.create_function("word_match", 2, _word_match, deterministic=True)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """A connection for the duration of the with block (waits if all size are in use)"""
+        if self.closed:
+            raise sqlite3.ProgrammingError(f"{self.path}: connection pool is closed")
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                opened = self._opened < self.size
+                if opened:
+                    self._opened += 1
+            if opened:
+                try:
+                    conn = self._open()
+                except BaseException:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+            else:
+                conn = self._idle.get(timeout=self.timeout)
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                if not self.closed:
+                    self._idle.put(conn)
+                    conn = None
+                else:
+                    self._opened -= 1
+            if conn is not None:
+                conn.close()
+
+    def close(self) -> None:
+        """Close the idle connections (connections in use are closed as they come back)"""
+        with self._lock:
+            self.closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+
+class WardrobeStore:
+    """A wardrobe in a SQLite file: items by position, tag postings, an LRU cache of hot rows"""
+
+    def __init__(self, path: str, pool_size: int = DEFAULT_POOL_SIZE, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.path = path
+        self.pool = ConnectionPool(path, pool_size)
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[int, Dict]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Writes so far through this store; views taken earlier are stale
+        self.version = 0
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+            self.count = conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    # --- reads ---
+    def item(self, pos: int) -> Dict:
+        """The item at pos (KeyError if there is none)"""
+        with self._cache_lock:
+            item = self._cache.get(pos)
+            if item is not None:
+                self._cache.move_to_end(pos)
+                self.hits += 1
+                return item
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT record FROM items WHERE pos = ?", (pos,)).fetchone()
+        if row is None:
+            raise KeyError(f"no item at position {pos}")
+        item = json.loads(row[0])
+        with self._cache_lock:
+            self.misses += 1
+            self._cache[pos] = item
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return item
+
+    def get(self, item_id) -> Optional[Dict]:
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT pos FROM items WHERE id = ?", (item_id,)).fetchone()
+        return self.item(row[0]) if row else None
+
+    @property
+    def items(self) -> "StoreItems":
+        """The items as a list, fetched by position on access, valid until the next write"""
+        return StoreItems(self)
+
+    def lower_names(self) -> List[str]:
+        with self.pool.connection() as conn:
+            return [name for (name,) in conn.execute("SELECT name_lower FROM items ORDER BY pos")]
+
+    def _positions(self, sql: str, params: Sequence = ()) -> int:
+        """Bitset of the pos column of a query that returns positions in ascending order"""
+        with self.pool.connection() as conn:
+            return bits_from_positions([pos for (pos,) in conn.execute(sql, params)])
+
+    def tag_bits(self, tags: Sequence[str]) -> Dict[str, int]:
+        """Posting bitset per tag, in one query on the covering index"""
+        tags = list(tags)
+        positions: Dict[str, List[int]] = {tag: [] for tag in tags}
+        with self.pool.connection() as conn:
+            for start in range(0, len(tags), _MAX_PARAMS):
+                chunk = tags[start:start + _MAX_PARAMS]
+                rows = conn.execute(f"SELECT tag, pos FROM item_tags WHERE tag IN ({_placeholders(len(chunk))}) "
+                                    "ORDER BY tag, pos", chunk)
+                for tag, pos in rows:
+                    positions[tag].append(pos)
+        return {tag: bits_from_positions(p) for tag, p in positions.items()}
+
+    def category_bits(self, category: str) -> int:
+        return self._positions("SELECT pos FROM items WHERE category = ? ORDER BY pos", (category,))
+
+    def name_contains_bits(self, text: str) -> int:
+        return self._positions("SELECT pos FROM items WHERE instr(name_lower, ?) > 0 ORDER BY pos", (text,))
+
+    def name_word_bits(self, word: str) -> int:
+        return self._positions("SELECT pos FROM items WHERE instr(name_lower, ?) > 0 AND word_match(?, name_lower) "
+                               "ORDER BY pos", (word, word))
+
+    def tags_of(self, positions: List[int]) -> set:
+        tags = set()
+        with self.pool.connection() as conn:
+            for start in range(0, len(positions), _MAX_PARAMS):
+                chunk = positions[start:start + _MAX_PARAMS]
+                rows = conn.execute(f"SELECT DISTINCT tag FROM item_tags WHERE pos IN ({_placeholders(len(chunk))})",
+                                    chunk)
+                tags.update(tag for (tag,) in rows)
+        return tags
+
+    def select(self, category: str, any_of: Iterable[str] = (), none_of: Iterable[str] = (),
+               limit: Optional[int] = None) -> List[Dict]:
+        """Items of category with any of any_of (if given) and none of none_of, in wardrobe order, as one query"""
+        any_of, none_of = sorted(set(any_of)), sorted(set(none_of))
+        if any_of:
+            sql = (f"SELECT DISTINCT pos FROM item_tags WHERE category = ? "
+                   f"AND tag IN ({_placeholders(len(any_of))})")
+        else:
+            sql = "SELECT pos FROM items WHERE category = ?"
+        params = [category] + any_of
+        if none_of:
+            sql += f" AND pos NOT IN (SELECT pos FROM item_tags WHERE tag IN ({_placeholders(len(none_of))}))"
+            params += none_of
+        sql += " ORDER BY pos"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self.pool.connection() as conn:
+            positions = [pos for (pos,) in conn.execute(sql, params)]
+        return [self.item(pos) for pos in positions]
+
+    def catalog(self) -> CardinalityCatalog:
+        """Tag x category counts, aggregated in SQL"""
+        catalog = CardinalityCatalog()
+        catalog.size = self.count
+        with self.pool.connection() as conn:
+            for tag, category, count in conn.execute(
+                    "SELECT tag, category, COUNT(*) FROM item_tags GROUP BY tag, category"):
+                catalog.pairs[(tag, category)] = count
+                catalog.tags[tag] += count
+            for category, count in conn.execute("SELECT category, COUNT(*) FROM items GROUP BY category"):
+                catalog.categories[category] = count
+        return catalog
+
+    def tag_index(self) -> "SqliteTagIndex":
+        return SqliteTagIndex(self)
+
+    # --- writes ---
+    # Each runs in one transaction, clears the row cache and bumps version, which makes earlier views stale.
+    def add_items(self, items: Iterable[Dict]) -> int:
+        """Append items (ids must be unique across the store); returns how many were added"""
+        with self.pool.connection() as conn:
+            with conn:
+                pos = conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+                start = pos
+                for item in items:
+                    self._insert(conn, pos, _normalized(item))
+                    pos += 1
+        self._written(pos)
+        return pos - start
+
+    def update_item(self, item_id, item: Dict) -> None:
+        """Replace the item with item_id by item, keeping its position"""
+        with self.pool.connection() as conn:
+            with conn:
+                pos = self._pos(conn, item_id)
+                conn.execute("DELETE FROM item_tags WHERE pos = ?", (pos,))
+                conn.execute("DELETE FROM items WHERE pos = ?", (pos,))
+                self._insert(conn, pos, _normalized(item))
+        self._written(self.count)
+
+    def remove_item(self, item_id) -> Dict:
+        """Delete the item with item_id; later items move up one position"""
+        with self.pool.connection() as conn:
+            with conn:
+                pos = self._pos(conn, item_id)
+                record = conn.execute("SELECT record FROM items WHERE pos = ?", (pos,)).fetchone()[0]
+                conn.execute("DELETE FROM item_tags WHERE pos = ?", (pos,))
+                conn.execute("DELETE FROM items WHERE pos = ?", (pos,))
+                # Via negative positions, so no row passes through one that is still taken
+                for table in ("items", "item_tags"):
+                    conn.execute(f"UPDATE {table} SET pos = -(pos - 1) WHERE pos > ?", (pos,))
+                    conn.execute(f"UPDATE {table} SET pos = -pos WHERE pos < 0")
+        self._written(self.count - 1)
+        return json.loads(record)
+
+    @staticmethod
+    def _pos(conn: sqlite3.Connection, item_id) -> int:
+        row = conn.execute("SELECT pos FROM items WHERE id = ?", (item_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"no item with id {item_id!r}")
+        return row[0]
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, pos: int, item: Dict) -> None:
+        category = item["category"]
+        name = item.get("name", "")
+        if not isinstance(name, str):
+            raise ValueError(f"item {item.get('id')!r}: name must be a string, not {type(name).__name__}")
+        try:
+            conn.execute("INSERT INTO items (pos, id, name_lower, category, record) VALUES (?, ?, ?, ?, ?)",
+                         (pos, item.get("id"), name.lower(), category,
+                          json.dumps(item, separators=(",", ":"), ensure_ascii=False)))
+        except sqlite3.IntegrityError:
+            raise ValueError(f"duplicate item id {item.get('id')!r}") from None
+        conn.executemany("INSERT INTO item_tags (tag, category, pos) VALUES (?, ?, ?)",
+                         [(tag, category, pos) for tag in set(item["tags"])])
+
+    def _written(self, count: int) -> None:
+        with self._cache_lock:
+            self._cache.clear()
+            self.count = count
+            self.version += 1
+
+    def close(self) -> None:
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class StoreItems(LazyItems):
+    """A store's items as a list (see LazyItems) that raises StaleStoreError once the store is written.
+
+    A write to the list itself loads every item into memory; the list is then detached
+    from the store and no longer goes stale.
+    """
+
+    def __init__(self, store: WardrobeStore):
+        super().__init__(store)
+        self.store_version = store.version
+
+    @property
+    def detached(self) -> bool:
+        return self._list is not None
+
+    @property
+    def stale(self) -> bool:
+        return self._list is None and self._source.version != self.store_version
+
+    def check(self) -> None:
+        if self.stale:
+            raise StaleStoreError(f"{self._source.path}: the store was written after this view of it was taken")
+
+    def __len__(self) -> int:
+        self.check()
+        return super().__len__()
+
+    def __getitem__(self, i):
+        self.check()
+        return super().__getitem__(i)
+
+    def __iter__(self):
+        if self._list is not None:
+            return iter(self._list)
+        return (self[i] for i in range(len(self)))
+
+    def _materialize(self) -> List[Dict]:
+        self.check()
+        return super()._materialize()
+
+
+class SqliteTagIndex(TagIndex):
+    """A TagIndex whose postings are queried from a WardrobeStore on first use and then kept.
+
+    subset() and the mutations (add/replace/remove) need every posting, so the first of
+    them loads the rest; a mutation also detaches the items from the store, after which
+    the index is an ordinary in-memory one. Until then, every lookup raises
+    StaleStoreError once the store has been written.
+    """
+
+    def __init__(self, store: WardrobeStore):
+        super().__init__()
+        self.store = store
+        self.items = StoreItems(store)
+        self.all = (1 << store.count) - 1
+        self._lower_names = None
+        self._load_names = store.lower_names
+        self._complete = False
+
+    def _load_all(self) -> None:
+        self.items.check()
+        if self._complete:
+            return
+        with self.store.pool.connection() as conn:
+            tags = [tag for (tag,) in conn.execute("SELECT DISTINCT tag FROM item_tags")]
+            categories = [category for (category,) in conn.execute("SELECT DISTINCT category FROM items")]
+        self.tags = {tag: bits for tag, bits in self.store.tag_bits(tags).items() if bits}
+        self.categories = {category: self.store.category_bits(category) for category in categories}
+        self._complete = True
+
+    def tag(self, tag: str) -> int:
+        return self.any_tag((tag,))
+
+    def any_tag(self, tags: Iterable[str]) -> int:
+        self.items.check()
+        if self._complete:
+            return super().any_tag(tags)
+        postings = self.tags
+        missing = [tag for tag in tags if tag not in postings]
+        if missing:
+            # Tags the store doesn't have are kept as 0 so they aren't asked for again
+            postings.update(self.store.tag_bits(missing))
+        bits = 0
+        for tag in tags:
+            bits |= postings[tag]
+        return bits
+
+    def category(self, category: str) -> int:
+        self.items.check()
+        if self._complete:
+            return super().category(category)
+        bits = self.categories.get(category)
+        if bits is None:
+            bits = self.categories[category] = self.store.category_bits(category)
+        return bits
+
+    def name_contains(self, text: str) -> int:
+        self.items.check()
+        if self._complete or text in self._name_contains:
+            return super().name_contains(text)
+        bits = self._name_contains[text] = self.store.name_contains_bits(text)
+        return bits
+
+    def name_word(self, word: str) -> int:
+        self.items.check()
+        if self._complete or word in self._name_words:
+            return super().name_word(word)
+        bits = self._name_words[word] = self.store.name_word_bits(word)
+        return bits
+
+    def tags_of(self, bits: int) -> set:
+        self.items.check()
+        if self._complete:
+            return super().tags_of(bits)
+        return self.store.tags_of(self.positions(bits))
+
+    def subset(self, bits: int) -> TagIndex:
+        self._load_all()
+        return super().subset(bits)
+
+    def add(self, item: Dict) -> int:
+        self._load_all()
+        return super().add(item)
+
+    def replace(self, pos: int, item: Dict) -> Dict:
+        self._load_all()
+        return super().replace(pos, item)
+
+    def remove(self, pos: int) -> Dict:
+        self._load_all()
+        return super().remove(pos)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load or query a SQLite wardrobe store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    load = sub.add_parser("import", help="append the items of a wardrobe file (default: the bundled wardrobe_db)")
+    load.add_argument("wardrobe", nargs="?", help="wardrobe file (.json/.jsonl/.snap)")
+    load.add_argument("db", help="SQLite database path (created if missing)")
+    query = sub.add_parser("query", help="print the names of items matching a pool, in wardrobe order")
+    query.add_argument("db")
+    query.add_argument("category")
+    query.add_argument("--any", nargs="*", default=[], help="at least one of these tags")
+    query.add_argument("--none", nargs="*", default=[], help="none of these tags")
+    query.add_argument("--limit", type=int)
+    args = parser.parse_args(argv)
+
+    with WardrobeStore(args.db) as store:
+        if args.command == "import":
+            if args.wardrobe:
+                from wardrobe_file import iter_wardrobe
+                items = iter_wardrobe(args.wardrobe)
+            else:
+                from engine_loader import load_engine
+                items = load_engine().wardrobe_db
+            added = store.add_items(items)
+            print(f"{args.db}: added {added} items ({store.count} total)")
+            return 0
+        for item in store.select(args.category, args.any, args.none, args.limit):
+            print(item.get("name", item.get("id")))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())